@@ -0,0 +1,66 @@
+"""Benchmark: a 1000-post backfill, in-line paging vs. prefetching pages ahead, plus peak memory vs. building the whole list"""
+# Usage (from the repo root): python benchmarks/bench_backfill.py [--posts 1000] [--latency 0.1] [--work 0.1]
+# Reddit is `replay.ReplayServer` with `latency` seconds per listing page; `work` seconds of consumer time per page
+# stands in for expansion/archiving/writing the posts out.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from replay import ReplayServer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.1, help="Seconds per listing page from the stand-in Reddit")
+    parser.add_argument("--work", type=float, default=0.1, help="Consumer seconds per page")
+    args = parser.parse_args()
+
+    replay = ReplayServer(latency={"reddit": args.latency}, jitter=0.0).start()
+    scratch = tempfile.TemporaryDirectory()
+    os.environ.update({ # Before `redditor` is imported; see bench_offline.py
+        "REDDIT_OAUTH_URL": replay.url, "REDDIT_URL": replay.url, "CO_API_URL": replay.url,
+        "REDDIT_CLIENT_ID": "bench", "REDDIT_CLIENT_SECRET": "bench", "REDDIT_USERNAME": "bench", "REDDIT_PASSWORD": "bench",
+        "REDDIT_USER_AGENT": "redditor-bench/0.1", "COHERE_API_KEY": "bench", "ARCHIVE_ENABLED": "false",
+        "EXPOUND_CACHE_FILE": str(Path(scratch.name) / "expound.sqlite3"), "LOG_FILE": str(Path(scratch.name) / "bench.log"), "LOG_LEVEL": "WARNING",
+    })
+    sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+    from redditor import backfill, listing, main
+
+    reddit = main.create_client()
+
+    def consume(prefetch: int, limit: int) -> int:
+        count = 0
+        for count, _ in enumerate(backfill.iter_posts("bench", limit=limit, reddit=reddit, prefetch=prefetch), start=1):
+            if count % listing.LISTING_PAGE_SIZE == 0:
+                time.sleep(args.work)
+        return count
+
+    print(f"{'prefetch':>8} | {'posts':>5} | {'time (s)':>8} | {'requests':>8}")
+    for prefetch in (0, 1, 2):
+        replay.reset_stats()
+        start: float = time.perf_counter()
+        count: int = consume(prefetch, args.posts)
+        print(f"{prefetch:>8} | {count:>5} | {time.perf_counter() - start:>8.2f} | {replay.stats['requests']:>8}")
+
+    args.work = 0.0
+    print(f"\n{'mode':>9} | {'posts':>5} | {'peak (KiB)':>10}")
+    for limit in (args.posts // 5, args.posts):
+        for mode in ("generator", "list"):
+            tracemalloc.start()
+            if mode == "generator":
+                consume(2, limit)
+            else:
+                posts = list(backfill.iter_posts("bench", limit=limit, reddit=reddit, prefetch=2))
+            peak: int = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{mode:>9} | {limit:>5} | {peak / 1024:>10.0f}")
+
+    replay.stop()
+    print("\n🐬")
@@ -0,0 +1,73 @@
+"""Benchmark: 20 subreddits via `fetch_many_posts` vs. a serial `fetch_latest_posts` loop, against a stubbed Reddit and Cohere"""
+# Usage: python benchmarks/bench_batch.py [--subreddits 20] [--latency 0.1] [--workers 4]
+# Each stubbed Reddit request sleeps `latency`; request counts are reported alongside wall-clock time.
+
+import time
+import argparse
+import threading
+from types import SimpleNamespace
+from typing import Any, Iterator
+
+from redditor import ai, archive, main
+
+
+class StubReddit:
+    """Just enough of `praw.Reddit` for the fetch paths: `request()` for listings and `info()`. Clients made from one
+    `tally` dict add their requests to it, since `fetch_many_posts` gives each worker thread its own client."""
+    _lock = threading.Lock()
+
+    def __init__(self, latency: float, tally: dict[str, int]) -> None:
+        self.latency = latency
+        self.tally = tally
+
+    def _request(self) -> None:
+        with self._lock:
+            self.tally["requests"] += 1
+        time.sleep(self.latency)
+
+    def request(self, method: str, path: str, params: dict[str, Any]) -> dict[str, Any]:
+        self._request()
+        name: str = path.split("/")[1]
+        children: list[dict[str, Any]] = [
+            {"kind": "t3", "data": {"id": f"{name}_{i}", "created_utc": float(i), "title": f"r/{name} post {i}", "author": f"user{i}", "score": i}}
+            for i in range(params["limit"])
+        ]
+        return {"kind": "Listing", "data": {"after": None, "children": children}}
+
+    def info(self, subreddits: list[str]) -> Iterator[SimpleNamespace]:
+        for start in range(0, len(subreddits), 100):
+            self._request()
+            yield from (SimpleNamespace(display_name=name) for name in subreddits[start:start + 100])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subreddits", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1, help="Stubbed seconds per Reddit request")
+    parser.add_argument("--workers", type=int, default=main.BATCH_MAX_WORKERS)
+    args = parser.parse_args()
+
+    archive.ARCHIVE_ENABLED = False
+    ai.expound_titles = lambda titles, **kwargs: [f"Expanded: {title}" for title in titles] # type: ignore
+    main.expound_titles = ai.expound_titles # Bound at import in `main`
+    names: list[str] = [f"sub{i}" for i in range(args.subreddits)]
+
+    serial_tally: dict[str, int] = {"requests": 0}
+    serial_reddit = StubReddit(args.latency, serial_tally)
+    start: float = time.perf_counter()
+    serial = {name: main.fetch_latest_posts(serial_reddit, name) for name in names} # type: ignore
+    serial_time: float = time.perf_counter() - start
+
+    batch_tally: dict[str, int] = {"requests": 0}
+    batch_reddit = StubReddit(args.latency, batch_tally)
+    main.create_client = lambda verify=True: StubReddit(args.latency, batch_tally) # type: ignore # The worker threads' own clients
+    start = time.perf_counter()
+    batch = main.fetch_many_posts(names, reddit=batch_reddit, max_workers=args.workers) # type: ignore
+    batch_time: float = time.perf_counter() - start
+
+    assert all(batch[name]["posts"] == serial[name] for name in names), "Batch results must match the serial loop"
+    print(f"{'mode':>7} | {'time (s)':>8} | {'requests':>8}")
+    print(f"{'serial':>7} | {serial_time:>8.3f} | {serial_tally['requests']:>8}")
+    print(f"{'batch':>7} | {batch_time:>8.3f} | {batch_tally['requests']:>8}")
+
+    print("\n🐬")
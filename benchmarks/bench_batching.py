@@ -0,0 +1,74 @@
+"""Benchmark: batched vs. per-title expansion against a local Cohere stub that counts requests and tokens"""
+# Usage: python benchmarks/bench_batching.py [--titles 100] [--batch-size 10] [--base-latency 0.3] [--token-latency 0.002]
+# The stub charges a fixed latency per call plus a little per output token, and estimates tokens as characters / 4.
+
+import re
+import json
+import time
+import argparse
+import threading
+from types import SimpleNamespace
+
+from redditor import ai
+
+INPUT_PRICE: float = 2.50 / 1_000_000 # USD per input token, command-a-03-2025
+OUTPUT_PRICE: float = 10.00 / 1_000_000 # USD per output token
+
+
+def tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class StubCohere:
+    """Answers single and batched prompts in the shape the real model is asked for, and tallies usage."""
+    def __init__(self, base_latency: float, token_latency: float) -> None:
+        self.base_latency = base_latency
+        self.token_latency = token_latency
+        self.usage: dict[str, int] = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+        self._lock = threading.Lock()
+
+    def chat(self, **kwargs):
+        prompt: str = kwargs["messages"][0]["content"]
+        numbered: list[tuple[str, str]] = re.findall(r"^(\d+)\. (.+)$", prompt, flags=re.MULTILINE)
+        paragraph = lambda title: f"{title} is a question many people ask; here is a short paragraph of context about it."
+        if numbered:
+            text: str = json.dumps([{"i": int(i), "text": paragraph(title)} for i, title in numbered])
+        else:
+            text = paragraph(prompt.splitlines()[-1])
+
+        with self._lock:
+            self.usage["requests"] += 1
+            self.usage["input_tokens"] += tokens(prompt)
+            self.usage["output_tokens"] += tokens(text)
+        time.sleep(self.base_latency + self.token_latency * tokens(text))
+        return SimpleNamespace(model_dump=lambda: {"message": {"content": [{"text": text}]}})
+
+
+def run(name: str, expand, titles: list[str], args: argparse.Namespace) -> None:
+    ai.co = StubCohere(args.base_latency, args.token_latency) # type: ignore
+    ai.cache = ai.ExpansionCache(path=None)
+    start: float = time.perf_counter()
+    results = expand(titles)
+    elapsed: float = time.perf_counter() - start
+    assert all(results), f"{name}: every title should be expanded"
+
+    usage: dict[str, int] = ai.co.usage # type: ignore
+    cost: float = usage["input_tokens"] * INPUT_PRICE + usage["output_tokens"] * OUTPUT_PRICE
+    print(f"{name:>10} | {elapsed:>8.2f} | {usage['requests']:>8} | {usage['input_tokens']:>9} | {usage['output_tokens']:>9} | {cost:>10.5f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=ai.EXPOUND_BATCH_SIZE)
+    parser.add_argument("--base-latency", type=float, default=0.3, help="Stubbed fixed seconds per call")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="Stubbed seconds per output token")
+    args = parser.parse_args()
+
+    titles: list[str] = [f"Why does thing number {i} happen?" for i in range(args.titles)]
+    print(f"Batch size {args.batch_size} (model cap allows up to {ai.max_batch_size()})\n")
+    print(f"{'mode':>10} | {'time (s)':>8} | {'requests':>8} | {'in tokens':>9} | {'out tokens':>9} | {'cost (USD)':>10}")
+    run("per-title", lambda titles: ai.expound_titles(titles), titles, args)
+    run("batched", lambda titles: ai.expound_titles_batched(titles, batch_size=args.batch_size), titles, args)
+
+    print("\n🐬")
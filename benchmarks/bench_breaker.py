@@ -0,0 +1,106 @@
+"""Benchmark: title expansion through a Cohere outage and a slow tail, with and without the circuit breaker and hedging"""
+# Usage (from the repo root): python benchmarks/bench_breaker.py [--pages 12] [--timeout 1.0] [--tail-rate 0.05] [--tail-latency 2.0]
+# Cohere is `replay.ReplayServer` standing in as a fake LLM. Scenarios:
+#   outage (hang): every call outlasts the client timeout; outage (503): every call fails. Pages of 5 new titles are
+#                  expanded one after another, breaker off vs. on, then Cohere recovers and the time until the first
+#                  successful page is reported (the breaker has to half-open and probe first).
+#   slow tail:     `--tail-rate` of calls take `--tail-latency` longer; single-title calls with hedging off vs. on.
+
+import io
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from typing import Any, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from replay import ReplayServer
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered: list[float] = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=12, help="Pages of 5 titles expanded during the outage")
+    parser.add_argument("--latency", type=float, default=0.15, help="Normal Cohere latency, seconds")
+    parser.add_argument("--timeout", type=float, default=1.0, help="Client timeout per Cohere call (EXPOUND_TIMEOUT)")
+    parser.add_argument("--open-seconds", type=float, default=2.0, help="Breaker open time before probing")
+    parser.add_argument("--calls", type=int, default=300, help="Calls in the slow-tail scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--tail-rate", type=float, default=0.05)
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    replay = ReplayServer(latency={"cohere": args.latency}, jitter=0.2).start()
+    scratch = tempfile.TemporaryDirectory()
+    os.environ.update({ # Before `redditor` is imported; see bench_offline.py
+        "REDDIT_OAUTH_URL": replay.url, "REDDIT_URL": replay.url, "CO_API_URL": replay.url,
+        "REDDIT_CLIENT_ID": "bench", "REDDIT_CLIENT_SECRET": "bench", "REDDIT_USERNAME": "bench", "REDDIT_PASSWORD": "bench",
+        "REDDIT_USER_AGENT": "redditor-bench/0.1", "COHERE_API_KEY": "bench", "ARCHIVE_ENABLED": "false",
+        "EXPOUND_CACHE_FILE": str(Path(scratch.name) / "expound.sqlite3"), "LOG_FILE": str(Path(scratch.name) / "bench.log"), "LOG_LEVEL": "ERROR",
+    })
+    sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+    from redditor import ai
+    from redditor.breaker import CircuitBreaker
+
+    titles = (f"Benchmark title {i}" for i in range(10**9)) # Always new, so the expansion cache never answers
+
+    def expand_page() -> tuple[float, int]:
+        """Expand 5 fresh titles the way a page does; returns wall time and how many came back."""
+        start: float = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()): # expound_title prints each failure
+            results: list[Optional[str]] = ai.expound_titles([next(titles) for _ in range(5)], timeout=args.timeout)
+        return time.perf_counter() - start, sum(result is not None for result in results)
+
+    # -- Outage and recovery
+    print(f"{'scenario':<16} | {'breaker':<7} | {'pages':>5} | {'page p50 (s)':>12} | {'total (s)':>9} | {'cohere reqs':>11} | {'recovered in (s)':>16} | {'short-circuited':>15}")
+    for outage in ("hang", "503"):
+        for enabled in (False, True):
+            ai.breaker = CircuitBreaker("cohere", enabled=enabled, open_seconds=args.open_seconds, slow_seconds=args.timeout)
+            replay.reset_stats()
+            replay.latency["cohere"], replay.error_rate = (args.timeout * 3, 0.0) if outage == "hang" else (args.latency, 1.0)
+            started: float = time.perf_counter()
+            pages: list[float] = [expand_page()[0] for _ in range(args.pages)]
+            total: float = time.perf_counter() - started
+            requests: int = replay.stats["cohere"]
+
+            replay.latency["cohere"], replay.error_rate = args.latency, 0.0 # Cohere comes back
+            recovered: float = time.perf_counter()
+            while expand_page()[1] == 0:
+                time.sleep(0.05)
+            print(f"{'outage (' + outage + ')':<16} | {'on' if enabled else 'off':<7} | {len(pages):>5} | {percentile(pages, 50):>12.2f} | {total:>9.2f} | {requests:>11} | {time.perf_counter() - recovered:>16.2f} | {ai.breaker.stats['short_circuited']:>15}")
+
+    # -- Slow tail
+    async def tail_run(hedge: bool) -> dict[str, Any]:
+        ai.breaker = CircuitBreaker("cohere", hedge=hedge, hedge_min_delay=0.05, slow_seconds=args.tail_latency * 4)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(title: str) -> float:
+            async with semaphore:
+                start: float = time.perf_counter()
+                await ai.aexpound_title(title, timeout=args.tail_latency * 4)
+                return time.perf_counter() - start
+
+        await asyncio.gather(*(one(next(titles)) for _ in range(40))) # Warm up the p95 estimate
+        replay.reset_stats()
+        latencies: list[float] = list(await asyncio.gather(*(one(next(titles)) for _ in range(args.calls))))
+        return {"p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99),
+                "requests": replay.stats["cohere"], "hedged": ai.breaker.stats["hedged"], "wins": ai.breaker.stats["hedge_wins"]}
+
+    async def tail_runs() -> list[dict[str, Any]]:
+        return [await tail_run(hedge) for hedge in (False, True)] # One loop: the async Cohere client is bound to it
+
+    replay.latency["cohere"], replay.tail_rate, replay.tail_latency = args.latency, args.tail_rate, {"cohere": args.tail_latency}
+    print(f"\n{'slow tail':<16} | {'hedging':<7} | {'calls':>5} | {'p50 (ms)':>9} | {'p95 (ms)':>9} | {'p99 (ms)':>9} | {'cohere reqs':>11} | {'hedged':>6} | {'hedge won':>9}")
+    for hedge, row in zip((False, True), asyncio.run(tail_runs())):
+        print(f"{'':<16} | {'on' if hedge else 'off':<7} | {args.calls:>5} | {row['p50'] * 1000:>9.0f} | {row['p95'] * 1000:>9.0f} | {row['p99'] * 1000:>9.0f} | {row['requests']:>11} | {row['hedged']:>6} | {row['wins']:>9}")
+
+    replay.stop()
+    print("\n🐬")
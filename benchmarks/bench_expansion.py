@@ -0,0 +1,52 @@
+"""Benchmark: serial vs. parallel title expansion against a stubbed `co.chat`"""
+# Usage: python benchmarks/bench_expansion.py [--latency 0.2] [--workers 8]
+
+import time
+import argparse
+from types import SimpleNamespace
+
+from redditor import ai
+
+class StubChat:
+    """Stands in for `cohere.ClientV2`; sleeps `latency` seconds per call to mimic a Cohere round-trip."""
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+
+    def chat(self, **kwargs):
+        time.sleep(self.latency)
+        text: str = f"Expanded: {kwargs['messages'][0]['content'][-40:]}"
+        return SimpleNamespace(model_dump=lambda: {"message": {"content": [{"text": text}]}})
+
+
+def run(n: int, workers: int) -> tuple[float, float]:
+    titles: list[str] = [f"Post title number {i}" for i in range(n)]
+
+    ai.cache.clear()
+    start: float = time.perf_counter()
+    serial = [ai.expound_title(title) for title in titles]
+    serial_time: float = time.perf_counter() - start
+
+    ai.cache.clear()
+    start = time.perf_counter()
+    parallel = ai.expound_titles(titles, max_workers=workers)
+    parallel_time: float = time.perf_counter() - start
+
+    assert serial == parallel, "Parallel expansion must keep listing order"
+    return serial_time, parallel_time
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stubbed seconds per Cohere call")
+    parser.add_argument("--workers", type=int, default=ai.EXPOUND_MAX_WORKERS, help="Concurrency limit")
+    args = parser.parse_args()
+
+    ai.co = StubChat(args.latency) # type: ignore
+    ai.cache = ai.ExpansionCache(path=None) # Memory-only, cleared per run so every call reaches the stub
+
+    print(f"{'N':>5} | {'serial (s)':>10} | {'parallel (s)':>12} | {'speedup':>7}")
+    for n in (5, 25, 100):
+        serial_time, parallel_time = run(n, args.workers)
+        print(f"{n:>5} | {serial_time:>10.3f} | {parallel_time:>12.3f} | {serial_time / parallel_time:>6.1f}x")
+
+    print("\n🐬")
@@ -0,0 +1,77 @@
+"""Benchmark: fetching a subreddit's newest posts through PRAW objects vs. straight from the listing JSON"""
+# Usage (from the repo root): python benchmarks/bench_listing.py [--rounds 50] [--lookups 50]
+# Reddit is `replay.ReplayServer`. "praw" is the previous path: `subreddit._fetch()` to validate the name, then `Post`s
+# built from the `Submission`s `subreddit.new()` yields. "lean" is `listing.fetch_listing`: one request, `Post`s built
+# from the child dicts. Reported per 100 posts: Reddit requests and client CPU time (the main thread's, so the in-process
+# stand-in's own work is left out). Then `--lookups` fetches of a subreddit that doesn't exist, without and with the registry.
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+sys.path.insert(0, str(Path(__file__).parent))
+from replay import ReplayServer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=50, help="100-post listings fetched per path")
+    parser.add_argument("--lookups", type=int, default=50, help="Fetches of a missing subreddit")
+    args = parser.parse_args()
+
+    replay = ReplayServer(jitter=0.0, missing={"doesnotexist"}).start()
+    scratch = tempfile.TemporaryDirectory()
+    os.environ.update({ # Before `redditor` is imported; see bench_offline.py
+        "REDDIT_OAUTH_URL": replay.url, "REDDIT_URL": replay.url, "CO_API_URL": replay.url,
+        "REDDIT_CLIENT_ID": "bench", "REDDIT_CLIENT_SECRET": "bench", "REDDIT_USERNAME": "bench", "REDDIT_PASSWORD": "bench",
+        "REDDIT_USER_AGENT": "redditor-bench/0.1", "COHERE_API_KEY": "bench", "ARCHIVE_ENABLED": "false",
+        "EXPOUND_CACHE_FILE": str(Path(scratch.name) / "expound.sqlite3"), "LOG_FILE": str(Path(scratch.name) / "bench.log"), "LOG_LEVEL": "ERROR",
+    })
+    sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+    import prawcore
+    from redditor import listing, main
+    from redditor.models import Post
+
+    reddit = main.create_client()
+
+    def praw_path(name: str) -> list[Post]:
+        subreddit = reddit.subreddit(name)
+        subreddit._fetch()
+        return [Post(id=submission.id, created_utc=submission.created_utc, score=submission.score, author=str(submission.author),
+                     title=submission.title, subreddit=name) for submission in subreddit.new(limit=100)]
+
+    def lean_path(name: str) -> list[Post]:
+        return listing.fetch_listing(reddit, name, 100)[0]
+
+    paths: dict[str, Callable[[str], list[Post]]] = {"praw": praw_path, "lean": lean_path}
+    assert [post.as_dict() for post in praw_path("learnpython")] == [post.as_dict() for post in lean_path("learnpython")], "paths disagree"
+
+    print(f"{'path':<6} | {'posts':>6} | {'requests/100 posts':>18} | {'CPU ms/100 posts':>16} | {'wall ms/100 posts':>17}")
+    for label, fetch in paths.items():
+        replay.reset_stats()
+        cpu: float = time.thread_time()
+        wall: float = time.perf_counter()
+        posts: int = sum(len(fetch(f"bench{i}")) for i in range(args.rounds))
+        cpu, wall = time.thread_time() - cpu, time.perf_counter() - wall
+        print(f"{label:<6} | {posts:>6} | {replay.stats['reddit'] * 100 / posts:>18.2f} | {cpu * 1000 * 100 / posts:>16.2f} | {wall * 1000 * 100 / posts:>17.2f}")
+
+    print(f"\n{'missing subreddit':<18} | {'lookups':>7} | {'requests':>8} | {'refused from cache':>18}")
+    for label, fetch in (("praw", praw_path), ("lean + registry", lean_path)):
+        listing.subreddits.clear()
+        replay.reset_stats()
+        refused: int = 0
+        for _ in range(args.lookups):
+            try:
+                fetch("doesnotexist")
+            except prawcore.Redirect:
+                pass
+            except listing.SubredditNotFound:
+                refused += 1
+        print(f"{label:<18} | {args.lookups:>7} | {replay.stats['reddit']:>8} | {refused:>18}")
+
+    replay.stop()
+    print("\n🐬")
@@ -0,0 +1,77 @@
+"""Benchmark: cost of a log call on request threads, blocking file handler vs. the queue-based `setup_logging`"""
+# Usage: python benchmarks/bench_logging.py [--threads 8] [--records 2000] [--disk-latency 0.0002] [--queue-size 10000]
+# Both modes write through the same rotating file handler; `disk-latency` is added to every write to stand in for a
+# slow or contended log volume. Latency is per `logger.info` call, as seen by the calling thread.
+
+import time
+import logging
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+from statistics import quantiles
+
+from redditor import logs
+
+
+def run(threads: int, records: int) -> list[float]:
+    """Per-call latencies of `logger.info` from `threads` threads logging `records` lines each."""
+    logger: logging.Logger = logging.getLogger("bench")
+    latencies: list[list[float]] = [[] for _ in range(threads)]
+
+    def work(i: int) -> None:
+        for n in range(records):
+            start: float = time.perf_counter()
+            logger.info("🟢 Fetched %d posts from r/%s", n, f"sub{i}")
+            latencies[i].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=work, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return [latency for per_thread in latencies for latency in per_thread]
+
+
+def report(mode: str, latencies: list[float], elapsed: float, dropped: int = 0) -> None:
+    cuts: list[float] = quantiles(latencies, n=100)
+    print(f"{mode:>8} | {cuts[49] * 1e6:>8.1f} | {cuts[98] * 1e6:>8.1f} | {elapsed:>8.3f} | {dropped:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--records", type=int, default=2000, help="Log lines per thread")
+    parser.add_argument("--disk-latency", type=float, default=0.0002, help="Seconds added to every file write")
+    parser.add_argument("--queue-size", type=int, default=logs.LOG_QUEUE_SIZE)
+    args = parser.parse_args()
+
+    emit = logs.SizeAndTimeRotatingFileHandler.emit
+    def slow_emit(self: logs.SizeAndTimeRotatingFileHandler, record: logging.LogRecord) -> None:
+        time.sleep(args.disk_latency)
+        emit(self, record)
+    logs.SizeAndTimeRotatingFileHandler.emit = slow_emit # type: ignore[method-assign]
+
+    logs.stop_logging() # Importing `redditor` installs the queue; start from a bare root logger
+    root: logging.Logger = logging.getLogger()
+    root.setLevel(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'mode':>8} | {'p50 (us)':>8} | {'p99 (us)':>8} | {'wall (s)':>8} | {'dropped':>7}")
+
+        handler = logs.SizeAndTimeRotatingFileHandler(Path(tmp) / "blocking.log")
+        handler.setFormatter(logging.Formatter(logs.TEXT_FORMAT, logs.DATE_FORMAT))
+        root.addHandler(handler)
+        start: float = time.perf_counter()
+        latencies: list[float] = run(args.threads, args.records)
+        report("blocking", latencies, time.perf_counter() - start)
+        root.removeHandler(handler)
+        handler.close()
+
+        queued = logs.setup_logging(level="INFO", log_file=Path(tmp) / "queued.log", queue_size=args.queue_size)
+        logs._listener.handlers = tuple(h for h in logs._listener.handlers if type(h) is not logging.StreamHandler) # type: ignore[union-attr]
+        start = time.perf_counter()
+        latencies = run(args.threads, args.records)
+        report("queued", latencies, time.perf_counter() - start, queued.dropped)
+        logs.stop_logging()
+
+    print("\n🐬")
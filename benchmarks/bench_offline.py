@@ -0,0 +1,167 @@
+"""Offline benchmark suite: client creation, fetches, title expansion and the FastAPI app, against the replay server"""
+# Usage (from the repo root): python benchmarks/bench_offline.py [--cassette FILE] [--reddit-latency 0.05] [--cohere-latency 0.15]
+#                             [--error-rate 0.0] [--save report.json] [--compare baseline.json]
+# No credentials needed: PRAW, Async PRAW and Cohere are pointed at `replay.ReplayServer` through REDDIT_OAUTH_URL, REDDIT_URL and CO_API_URL.
+# `--save` writes the report as JSON; `--compare` prints each metric's change against a saved report and exits 1 when any
+# scenario got slower (or lost throughput) by more than `--threshold`, so a regression shows up in review.
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+from pathlib import Path
+from typing import Any, Callable, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from replay import ReplayServer
+
+
+def summarize(name: str, latencies: list[float], elapsed: float, upstream: dict[str, int], errors: int = 0) -> dict[str, Any]:
+    ordered: list[float] = sorted(latencies)
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, round(p / 100 * (len(ordered) - 1)))] * 1000
+    return {
+        "scenario": name, "n": len(latencies), "p50_ms": round(pct(50), 2), "p99_ms": round(pct(99), 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2), "throughput_rps": round(len(latencies) / elapsed, 2),
+        "errors": errors, "upstream_requests": upstream["requests"], "injected_errors": upstream["injected_errors"],
+    }
+
+def timed_calls(calls: list[Callable[[], Any]], concurrency: int, failed: Callable[[Any], bool] = lambda result: not result) -> tuple[list[float], float, int]:
+    """Run `calls` on `concurrency` threads. Returns per-call latencies, wall time and how many results were failures."""
+    def one(call: Callable[[], Any]) -> tuple[float, bool]:
+        start: float = time.perf_counter()
+        try:
+            bad: bool = failed(call())
+        except Exception:
+            bad = True
+        return time.perf_counter() - start, bad
+
+    start: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results: list[tuple[float, bool]] = list(pool.map(one, calls))
+    return [latency for latency, _ in results], time.perf_counter() - start, sum(bad for _, bad in results)
+
+
+def run_suite(replay: ReplayServer, args: argparse.Namespace) -> list[dict[str, Any]]:
+    from redditor import ai, main
+    from redditor.server import server
+    import httpx
+
+    report: list[dict[str, Any]] = []
+
+    def scenario(name: str, calls: list[Callable[[], Any]], concurrency: int = 1, **kwargs: Any) -> None:
+        ai.cache.clear()
+        replay.reset_stats()
+        latencies, elapsed, errors = timed_calls(calls, concurrency, **kwargs)
+        report.append(summarize(name, latencies, elapsed, replay.stats, errors))
+        print(f"   {name}: done", file=sys.stderr)
+
+    scenario("create_client", [main.create_client] * args.iterations, failed=lambda reddit: reddit is None)
+
+    reddit = main.create_client()
+    scenario("fetch_latest_posts", [lambda: main.fetch_latest_posts(reddit, "learnpython", args.posts)] * args.iterations)
+    scenario(f"fetch_latest_posts x{args.concurrency}", [lambda i=i: main.fetch_latest_posts(reddit, f"sub{i}", args.posts) for i in range(args.iterations * args.concurrency)], args.concurrency)
+
+    titles: list[str] = [f"Benchmark title {i}" for i in range(args.iterations * args.concurrency)]
+    scenario("expound_title", [lambda title=title: ai.expound_title(title) for title in titles[:args.iterations]])
+    scenario(f"expound_title x{args.concurrency}", [lambda title=title: ai.expound_title(title) for title in titles], args.concurrency)
+
+    async def drive_app(client: httpx.AsyncClient, path: str, requests: int) -> tuple[list[float], float, int]:
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one(i: int) -> tuple[float, bool]:
+            async with semaphore:
+                start: float = time.perf_counter()
+                if path == "/fetch_posts/":
+                    response = await client.post(path, data={"subreddit": f"sub{i}", "n": str(args.posts)})
+                else:
+                    response = await client.get(path, params={"subreddit": f"sub{i}", "n": args.posts})
+                return time.perf_counter() - start, response.status_code != 200 or response.content in (b"[]", b"")
+
+        start: float = time.perf_counter()
+        results: list[tuple[float, bool]] = await asyncio.gather(*(one(i) for i in range(requests)))
+        return [latency for latency, _ in results], time.perf_counter() - start, sum(bad for _, bad in results)
+
+    async def app_scenarios() -> None:
+        """Both app scenarios on one event loop, which the shared async Reddit client is bound to."""
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench", timeout=60) as client:
+            for path in ("/api/posts", "/fetch_posts/"):
+                ai.cache.clear()
+                replay.reset_stats()
+                latencies, elapsed, errors = await drive_app(client, path, args.iterations * args.concurrency)
+                report.append(summarize(f"app {path} x{args.concurrency}", latencies, elapsed, replay.stats, errors))
+                print(f"   app {path}: done", file=sys.stderr)
+        await server.close_async_client()
+
+    asyncio.run(app_scenarios())
+    return report
+
+
+def print_report(report: list[dict[str, Any]], baseline: Optional[dict[str, dict[str, Any]]] = None, threshold: float = 0.1) -> int:
+    """Print the report, with the change against `baseline` per metric. Returns the number of regressed scenarios."""
+    print(f"{'scenario':<28} | {'n':>4} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'mean (ms)':>9} | {'req/s':>8} | {'errors':>6} | {'upstream':>8} | {'injected':>8}")
+    regressions = 0
+    for row in report:
+        print(f"{row['scenario']:<28} | {row['n']:>4} | {row['p50_ms']:>9.1f} | {row['p99_ms']:>9.1f} | {row['mean_ms']:>9.1f} | {row['throughput_rps']:>8.1f} | {row['errors']:>6} | {row['upstream_requests']:>8} | {row['injected_errors']:>8}")
+        before: Optional[dict[str, Any]] = (baseline or {}).get(row["scenario"])
+        if before is None:
+            continue
+        changes: dict[str, float] = {metric: (row[metric] - before[metric]) / before[metric] for metric in ("p50_ms", "p99_ms", "mean_ms", "throughput_rps") if before[metric]}
+        regressed: bool = changes.get("p50_ms", 0) > threshold or changes.get("mean_ms", 0) > threshold or changes.get("throughput_rps", 0) < -threshold
+        regressions += regressed
+        print(f"{'  vs baseline':<28} | {'':>4} | {changes.get('p50_ms', 0):>+9.1%} | {changes.get('p99_ms', 0):>+9.1%} | {changes.get('mean_ms', 0):>+9.1%} | {changes.get('throughput_rps', 0):>+8.1%} |{' 🔴 regression' if regressed else ''}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cassette", type=Path, help="Recorded cassette (default: synthetic, see replay.py)")
+    parser.add_argument("--iterations", type=int, default=10, help="Calls per serial scenario; concurrent scenarios make iterations x concurrency")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--posts", type=int, default=5, help="Posts per fetch")
+    parser.add_argument("--reddit-latency", type=float, default=0.05)
+    parser.add_argument("--cohere-latency", type=float, default=0.15)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--ratelimit", choices=("unlimited", "recorded"), default="unlimited")
+    parser.add_argument("--save", type=Path, help="Write the report here as JSON")
+    parser.add_argument("--compare", type=Path, help="Saved report to diff against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative slowdown counted as a regression")
+    args = parser.parse_args()
+
+    replay = ReplayServer(
+        ReplayServer.load(args.cassette) if args.cassette else None, latency={"reddit": args.reddit_latency, "cohere": args.cohere_latency},
+        error_rate=args.error_rate, error_status=args.error_status, ratelimit=args.ratelimit,
+    ).start()
+
+    # Must be set before `redditor` is imported: the Cohere clients and module settings read them at import
+    scratch = tempfile.TemporaryDirectory()
+    os.environ.update({
+        "REDDIT_OAUTH_URL": replay.url, "REDDIT_URL": replay.url, "CO_API_URL": replay.url,
+        "REDDIT_CLIENT_ID": "bench", "REDDIT_CLIENT_SECRET": "bench", "REDDIT_USERNAME": "bench", "REDDIT_PASSWORD": "bench",
+        "REDDIT_USER_AGENT": "redditor-bench/0.1", "COHERE_API_KEY": "bench",
+        "ARCHIVE_ENABLED": "false", "RESPONSE_CACHE_TTL": "0", "RESPONSE_CACHE_STALE_TTL": "0",
+        "EXPOUND_CACHE_FILE": str(Path(scratch.name) / "expound.sqlite3"), "LOG_FILE": str(Path(scratch.name) / "bench.log"), "LOG_LEVEL": "WARNING",
+    })
+    sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+    report: list[dict[str, Any]] = run_suite(replay, args)
+    replay.stop()
+
+    baseline: Optional[dict[str, dict[str, Any]]] = None
+    if args.compare:
+        baseline = {row["scenario"]: row for row in json.loads(args.compare.read_text(encoding="utf-8"))["scenarios"]}
+    regressions: int = print_report(report, baseline, args.threshold)
+
+    if args.save:
+        environment: dict[str, Any] = {"python": platform.python_version(), "machine": platform.machine(), "cassette": str(args.cassette or "synthetic")}
+        settings: dict[str, Any] = {key: value for key, value in vars(args).items() if key not in ("save", "compare", "cassette")}
+        args.save.write_text(json.dumps({"environment": environment, "settings": settings, "scenarios": report}, indent=2), encoding="utf-8")
+
+    print("\n🐬")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,108 @@
+"""Check the rate-limit scheduler against a local fake Reddit that emits X-Ratelimit-* headers and 429s past its budget"""
+# Usage: python benchmarks/bench_ratelimit.py [--budget 30] [--window 3] [--requests 60] [--threads 8]
+# Compares plain `prawcore.Requestor` with `RateLimitedRequestor`, then plain `asyncprawcore.Requestor` with
+# `AsyncRateLimitedRequestor` (concurrent tasks instead of threads); the scheduled runs should see no 429s.
+
+import time
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import prawcore
+import asyncprawcore
+
+from redditor import ratelimit
+
+
+class FakeReddit(BaseHTTPRequestHandler):
+    """Fixed-window limiter: `budget` requests per `window` seconds, then 429 with Retry-After until the window resets."""
+    budget: int = 30
+    window: float = 3.0
+    _lock = threading.Lock()
+    _window_start: float = time.monotonic()
+    _used: int = 0
+
+    def do_GET(self) -> None:
+        with self._lock:
+            now: float = time.monotonic()
+            if now - FakeReddit._window_start >= self.window:
+                FakeReddit._window_start, FakeReddit._used = now, 0
+            FakeReddit._used += 1
+            reset: float = self.window - (now - FakeReddit._window_start)
+            remaining: int = max(self.budget - FakeReddit._used, 0)
+            limited: bool = FakeReddit._used > self.budget
+
+        self.send_response(429 if limited else 200)
+        self.send_header("x-ratelimit-used", str(FakeReddit._used))
+        self.send_header("x-ratelimit-remaining", f"{remaining:.1f}")
+        self.send_header("x-ratelimit-reset", str(max(int(reset), 1)))
+        if limited:
+            self.send_header("retry-after", str(max(int(reset), 1)))
+        self.send_header("content-type", "application/json")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def drive(requestor: prawcore.Requestor, url: str, requests: int, threads: int) -> tuple[float, int]:
+    """Send `requests` GETs over `threads` threads; return (elapsed seconds, 429 count)."""
+    start: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses: list[int] = list(pool.map(lambda _: requestor.request("GET", url).status_code, range(requests)))
+    return time.perf_counter() - start, statuses.count(429)
+
+async def adrive(requestor_class: type[asyncprawcore.Requestor], url: str, requests: int, concurrency: int) -> tuple[float, int]:
+    """Async `drive`: `requests` GETs as tasks, `concurrency` in flight at a time. The requestor is created on the loop
+    (asyncprawcore 2.x opens its aiohttp session in the constructor)."""
+    requestor = requestor_class(user_agent="redditor-bench/0.1")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one() -> int:
+        async with semaphore:
+            if ratelimit.ASYNC_REQUEST_IS_CONTEXT_MANAGER:
+                async with requestor.request("GET", url) as response:
+                    return response.status
+            response = await requestor.request("GET", url)
+            response.release()
+            return response.status
+
+    start: float = time.perf_counter()
+    try:
+        statuses: list[int] = list(await asyncio.gather(*(one() for _ in range(requests))))
+    finally:
+        await requestor.close()
+    return time.perf_counter() - start, statuses.count(429)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=int, default=30)
+    parser.add_argument("--window", type=float, default=3.0)
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    FakeReddit.budget, FakeReddit.window = args.budget, args.window
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeReddit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url: str = f"http://127.0.0.1:{server.server_port}/r/test/new"
+
+    ratelimit.scheduler = ratelimit.RateLimitScheduler(rate_limit=args.budget, window=args.window, burst=5)
+
+    print(f"{'requestor':>12} | {'elapsed (s)':>11} | {'429s':>4}")
+    for name, requestor in (("plain", prawcore.Requestor("redditor-bench/0.1")), ("scheduled", ratelimit.RateLimitedRequestor("redditor-bench/0.1"))):
+        time.sleep(args.window) # Start each run on a fresh window
+        elapsed, throttled = drive(requestor, url, args.requests, args.threads)
+        print(f"{name:>12} | {elapsed:>11.2f} | {throttled:>4}")
+    for name, requestor_class in (("async plain", asyncprawcore.Requestor), ("async sched.", ratelimit.AsyncRateLimitedRequestor)):
+        time.sleep(args.window)
+        elapsed, throttled = asyncio.run(adrive(requestor_class, url, args.requests, args.threads))
+        print(f"{name:>12} | {elapsed:>11.2f} | {throttled:>4}")
+
+    print(f"\nScheduler stats: {ratelimit.scheduler.stats}")
+    server.shutdown()
+    print("\n🐬")
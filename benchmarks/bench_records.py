@@ -0,0 +1,64 @@
+"""Benchmark: memory and JSON serialisation of 10k posts, per-post dicts vs. slotted `Post` records"""
+# Usage: python benchmarks/bench_records.py [--posts 10000] [--rounds 5]
+# "dicts" goes through FastAPI's default path (`jsonable_encoder` + `json.dumps`), as a plain `return posts` would.
+
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+from typing import Any, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+from redditor.models import Post, encode_posts
+
+
+def make_posts(n: int) -> list[Post]:
+    return [Post(id=f"1abc{i:05d}", created_utc=1745966000.0 + i, score=i % 5000, author=f"user_{i % 997}", title=f"Post title number {i} about something") for i in range(n)]
+
+
+def measure_memory(build: Callable[[], Any]) -> int:
+    """Bytes still allocated by `build()`'s result."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def throughput(encode: Callable[[], bytes], n: int, rounds: int) -> float:
+    """Posts serialised per second, best of `rounds`."""
+    best: float = float("inf")
+    for _ in range(rounds):
+        start: float = time.perf_counter()
+        encode()
+        best = min(best, time.perf_counter() - start)
+    return n / best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    records: list[Post] = make_posts(args.posts)
+    dicts: list[dict[str, Any]] = [{"id": p.id, "created_utc": p.created_utc, "score": p.score, "author": p.author, "title": p.title, "subreddit": p.subreddit, "expounded": p.expounded} for p in records]
+
+    dict_bytes: int = measure_memory(lambda: [dict(d) for d in dicts])
+    record_bytes: int = measure_memory(lambda: [Post(p.id, p.created_utc, p.score, p.author, p.title) for p in records])
+    print(f"Container memory for {args.posts} posts (strings shared): dicts {dict_bytes / 1024:.0f} KiB, records {record_bytes / 1024:.0f} KiB\n")
+
+    print(f"{'encoder':>28} | {'posts/s':>10}")
+    rows: list[tuple[str, Callable[[], bytes]]] = [
+        ("dicts, jsonable_encoder", lambda: json.dumps(jsonable_encoder(dicts)).encode("utf-8")),
+        ("records, encode_posts", lambda: encode_posts(records)),
+        ("records, fields=id,title", lambda: encode_posts(records, ("id", "title"))),
+    ]
+    for name, encode in rows:
+        print(f"{name:>28} | {throughput(encode, args.posts, args.rounds):>10.0f}")
+
+    print("\n🐬")
@@ -0,0 +1,65 @@
+"""Load test: `/fetch_posts/` latency under concurrent requests, blocking (before) vs. async (after) pipeline"""
+# Usage (from the repo root): python benchmarks/bench_server_load.py [--concurrency 50] [--latency 0.25]
+# Reddit and Cohere are stubbed with fixed sleeps, so the numbers isolate event-loop behaviour.
+
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+from fastapi import Form, Request
+
+from redditor.server import server
+
+POSTS: list[dict[str, str]] = [{"title": "Stub title", "author": "stub", "upvotes": 1, "expounded": "Stub expansion."}] # type: ignore
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered: list[float] = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+async def drive(path: str, concurrency: int) -> list[float]:
+    """Fire `concurrency` simultaneous form posts at `path`; return each request's latency in seconds, measured from the shared start."""
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start: float = time.perf_counter() # All requests arrive together, so time spent queued behind a blocked loop counts
+
+        async def one(i: int) -> float:
+            response: httpx.Response = await client.post(path, data={"subreddit": f"sub{i}", "n": "1"})
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        return list(await asyncio.gather(*(one(i) for i in range(concurrency))))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.25, help="Stubbed upstream seconds per request")
+    args = parser.parse_args()
+
+    # Before: the old handler shape, a blocking fetch called straight from `async def`
+    def fetch_blocking(subreddit_name: str, limit: int) -> list[dict[str, str]]:
+        time.sleep(args.latency)
+        return POSTS
+
+    @server.app.post("/fetch_posts_blocking/")
+    async def fetch_posts_blocking(request: Request, subreddit: str = Form(...), n: int = Form(5)):
+        posts = fetch_blocking(subreddit_name=subreddit, limit=n)
+        return server.templates.TemplateResponse("index.html", context={"request": request, "posts": posts})
+
+    # After: the real handler, with the async fetch stubbed
+    async def fetch_async(reddit=None, subreddit_name: str = "", limit: int = 5) -> list[dict[str, str]]:
+        await asyncio.sleep(args.latency)
+        return POSTS
+
+    server.afetch_latest_posts = fetch_async # type: ignore
+
+    print(f"{'pipeline':>9} | {'p50 (s)':>8} | {'p99 (s)':>8} | {'mean (s)':>8}")
+    for name, path in (("blocking", "/fetch_posts_blocking/"), ("async", "/fetch_posts/")):
+        latencies: list[float] = asyncio.run(drive(path, args.concurrency))
+        print(f"{name:>9} | {percentile(latencies, 50):>8.3f} | {percentile(latencies, 99):>8.3f} | {statistics.mean(latencies):>8.3f}")
+
+    print("\n🐬")
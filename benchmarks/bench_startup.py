@@ -0,0 +1,34 @@
+"""Benchmark: cold-start time, i.e. importing `redditor.main` and the FastAPI app in a fresh interpreter"""
+# Usage (from the repo root): python benchmarks/bench_startup.py [--runs 5]
+# Neither import should touch the network; run with empty Reddit credentials to confirm it doesn't need them either.
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+MODULES: tuple[str, ...] = ("redditor.main", "redditor.server.server")
+
+
+def cold_import(module: str) -> float:
+    """Seconds for a fresh interpreter to import `module` and exit."""
+    start: float = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    baseline: float = statistics.median(cold_import("sys") for _ in range(args.runs)) # Interpreter start-up alone
+
+    print(f"{'module':>24} | {'median (s)':>10} | {'max (s)':>8} | {'minus interpreter (s)':>21}")
+    for module in MODULES:
+        samples: list[float] = [cold_import(module) for _ in range(args.runs)]
+        print(f"{module:>24} | {statistics.median(samples):>10.3f} | {max(samples):>8.3f} | {statistics.median(samples) - baseline:>21.3f}")
+
+    print(f"\nFor a per-module breakdown: {sys.executable} -X importtime -c 'import redditor.server.server'")
+    print("\n🐬")
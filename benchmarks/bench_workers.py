@@ -0,0 +1,139 @@
+"""Scaling benchmark: the server under 1/2/4/8 uvicorn workers, each with its own cache and rate budget vs. sharing them"""
+# Usage (from the repo root): python benchmarks/bench_workers.py [--workers 1 2 4 8] [--requests 400] [--concurrency 32] [--keys 24]
+# Each run starts `uvicorn --workers N` as a subprocess against `replay.ReplayServer` with `--ratelimit enforced`, so Reddit
+# allows `--budget` requests per `--window` seconds and answers 429 beyond that. Load is `/api/posts` (with expansions)
+# spread over `--keys` subreddits. "isolated" leaves SHARED_STATE_FILE unset; "shared" points every worker at one file.
+# Reported per run: throughput, p50/p99 latency, upstream Reddit and Cohere requests, and 429s Reddit sent back.
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).parent))
+from replay import ReplayServer
+
+ROOT: Path = Path(__file__).parent.parent
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered: list[float] = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))]
+
+
+def start_server(workers: int, shared: bool, replay: ReplayServer, scratch: Path) -> tuple[subprocess.Popen, str]:
+    """Launch uvicorn with `workers` processes and wait until it answers. Returns the process and its base URL."""
+    port: int = free_port()
+    env: dict[str, str] = {
+        **os.environ, "PYTHONPATH": str(ROOT / "src"),
+        "REDDIT_OAUTH_URL": replay.url, "REDDIT_URL": replay.url, "CO_API_URL": replay.url,
+        "REDDIT_CLIENT_ID": "bench", "REDDIT_CLIENT_SECRET": "bench", "REDDIT_USERNAME": "bench", "REDDIT_PASSWORD": "bench",
+        "REDDIT_USER_AGENT": "redditor-bench/0.1", "COHERE_API_KEY": "bench", "ARCHIVE_ENABLED": "false",
+        "EXPOUND_CACHE_FILE": str(scratch / "expound.sqlite3"), "LOG_FILE": str(scratch / "bench.log"), "LOG_LEVEL": "ERROR", # 429 retries would flood the console
+    }
+    env["WEB_CONCURRENCY"] = str(workers) # So each worker logs to its own file
+    env.pop("SHARED_STATE_FILE", None)
+    if shared:
+        env["SHARED_STATE_FILE"] = str(scratch / "shared.sqlite3")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "redditor.server.server:app", "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    url: str = f"http://127.0.0.1:{port}"
+    deadline: float = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/cache/stats", timeout=1).status_code == 200:
+                time.sleep(0.5 * workers) # The first worker up answers; give the rest time to finish importing
+                return process, url
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with {process.returncode}")
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not come up within 60s")
+
+
+async def drive(url: str, requests: int, concurrency: int, keys: int, posts: int) -> tuple[list[float], float, int]:
+    """`requests` GETs of `/api/posts` over `keys` subreddits, `concurrency` at a time. Returns latencies, wall time and failures."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=0) # New connections, so the kernel spreads them over workers
+
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        async def one(i: int) -> tuple[float, bool]:
+            async with semaphore:
+                start: float = time.perf_counter()
+                try:
+                    response = await client.get("/api/posts", params={"subreddit": f"sub{i % keys}", "n": posts, "fields": "id,title,expounded"})
+                    bad: bool = response.status_code != 200 or response.content == b"[]"
+                except httpx.HTTPError:
+                    bad = True
+                return time.perf_counter() - start, bad
+
+        start: float = time.perf_counter()
+        results: list[tuple[float, bool]] = await asyncio.gather(*(one(i) for i in range(requests)))
+    return [latency for latency, _ in results], time.perf_counter() - start, sum(bad for _, bad in results)
+
+
+def run(workers: int, shared: bool, replay: ReplayServer, args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory() as scratch:
+        process, url = start_server(workers, shared, replay, Path(scratch))
+        try:
+            replay.reset_stats()
+            latencies, elapsed, errors = asyncio.run(drive(url, args.requests, args.concurrency, args.keys, args.posts))
+            stats: dict[str, int] = dict(replay.stats)
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired: # Graceful shutdown waits on in-flight requests
+                process.kill()
+    return {
+        "workers": workers, "mode": "shared" if shared else "isolated", "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 50) * 1000, "p99_ms": percentile(latencies, 99) * 1000, "errors": errors,
+        "reddit": stats["reddit"], "cohere": stats["cohere"], "throttled": stats["throttled"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--keys", type=int, default=24, help="Distinct subreddits requested")
+    parser.add_argument("--posts", type=int, default=5, help="Posts per request")
+    parser.add_argument("--reddit-latency", type=float, default=0.05)
+    parser.add_argument("--cohere-latency", type=float, default=0.15)
+    parser.add_argument("--budget", type=int, default=40, help="Reddit requests allowed per window")
+    parser.add_argument("--window", type=float, default=10.0, help="Reddit rate-limit window, seconds")
+    args = parser.parse_args()
+
+    replay = ReplayServer(latency={"reddit": args.reddit_latency, "cohere": args.cohere_latency}, ratelimit="enforced", budget=args.budget, window=args.window).start()
+    print(f"⚪ {os.cpu_count()} CPU(s); {args.requests} requests over {args.keys} subreddits, {args.concurrency} at a time; Reddit budget {args.budget}/{args.window:g}s", file=sys.stderr)
+
+    rows: list[dict[str, Any]] = []
+    for workers in args.workers:
+        for shared in (False, True):
+            rows.append(run(workers, shared, replay, args))
+            print(f"   {workers} worker(s), {rows[-1]['mode']}: done", file=sys.stderr)
+    replay.stop()
+
+    print(f"{'workers':>7} | {'mode':<8} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'errors':>6} | {'reddit':>6} | {'cohere':>6} | {'429s':>5}")
+    for row in rows:
+        print(f"{row['workers']:>7} | {row['mode']:<8} | {row['throughput_rps']:>8.1f} | {row['p50_ms']:>9.1f} | {row['p99_ms']:>9.1f} | {row['errors']:>6} | {row['reddit']:>6} | {row['cohere']:>6} | {row['throttled']:>5}")
+
+    print("\n🐬")
@@ -0,0 +1,310 @@
+"""Stand-in Reddit/Cohere server: records real HTTP interactions into a cassette, or replays one with injected latency and errors"""
+# Usage:
+#   Record: python benchmarks/replay.py --record benchmarks/cassettes/live.json --port 8099
+#           then run the app with REDDIT_OAUTH_URL=REDDIT_URL=CO_API_URL=http://127.0.0.1:8099 and real credentials.
+#   Replay: python benchmarks/replay.py --cassette benchmarks/cassettes/live.json --port 8099 [--reddit-latency 0.2] [--error-rate 0.05]
+# Without `--cassette`, a synthetic cassette shaped like the responses in logs/test.log is served.
+#
+# One server stands in for all three upstreams; requests are told apart by path (see `UPSTREAMS`). `redditor` reads
+# `REDDIT_OAUTH_URL`/`REDDIT_URL` and the Cohere SDK reads `CO_API_URL`.
+
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+# -- (path prefix, upstream group, real base URL), first match wins
+UPSTREAMS: list[tuple[str, str, str]] = [
+    ("/v2/", "cohere", "https://api.cohere.com"),
+    ("/api/v1/access_token", "reddit", "https://www.reddit.com"),
+    ("/", "reddit", "https://oauth.reddit.com"),
+]
+UNLIMITED_RATELIMIT: dict[str, str] = {"x-ratelimit-remaining": "100000", "x-ratelimit-used": "0", "x-ratelimit-reset": "600"}
+HOP_HEADERS: set[str] = {"connection", "content-encoding", "content-length", "transfer-encoding", "keep-alive", "set-cookie"}
+SECRET_FIELDS: tuple[str, ...] = ("access_token", "refresh_token")
+
+
+def upstream(path: str) -> tuple[str, str]:
+    return next((group, base) for prefix, group, base in UPSTREAMS if path.startswith(prefix))
+
+def interaction_key(method: str, path: str) -> str:
+    """Cassette lookup key. Subreddit names are wildcarded, so one recorded listing answers for any subreddit."""
+    return f"{method} {re.sub(r'^/r/[^/]+', '/r/{subreddit}', path.rstrip('/') or '/')}"
+
+
+def synthetic_cassette(posts: int = 1000) -> list[dict[str, Any]]:
+    """Interactions shaped like real Reddit/Cohere responses (see logs/test.log), for benchmarking without a recording."""
+    now: float = time.time()
+    children: list[dict[str, Any]] = [
+        {"kind": "t3", "data": {
+            "id": f"1kb{i:04d}", "name": f"t3_1kb{i:04d}", "subreddit": "learnpython", "title": f"How do I speed up my Python script? (question {i})",
+            "author": f"user_{i % 37}", "score": (i * 7) % 250, "created_utc": now - i * 60, "num_comments": i % 12, "selftext": "",
+            "permalink": f"/r/learnpython/comments/1kb{i:04d}/", "url": f"https://www.reddit.com/r/learnpython/comments/1kb{i:04d}/",
+        }}
+        for i in range(posts)
+    ]
+    ratelimit: dict[str, str] = {"x-ratelimit-remaining": "999.0", "x-ratelimit-used": "1", "x-ratelimit-reset": "370"}
+    return [
+        {"method": "POST", "path": "/api/v1/access_token", "status": 200, "headers": {},
+         "body": {"access_token": "replayed-token", "token_type": "bearer", "expires_in": 86400, "scope": "*"}},
+        {"method": "GET", "path": "/api/v1/me", "status": 200, "headers": ratelimit, "body": {"name": "recorded-user", "id": "abc123"}},
+        {"method": "GET", "path": "/r/learnpython/about", "status": 200, "headers": ratelimit,
+         "body": {"kind": "t5", "data": {"display_name": "learnpython", "name": "t5_2r8ot", "id": "2r8ot", "subscribers": 1}}},
+        {"method": "GET", "path": "/r/learnpython/new", "status": 200, "headers": ratelimit,
+         "body": {"kind": "Listing", "data": {"after": None, "before": None, "dist": posts, "children": children}}},
+        {"method": "POST", "path": "/v2/chat", "status": 200, "headers": {},
+         "body": {"id": "replayed", "finish_reason": "COMPLETE",
+                  "message": {"role": "assistant", "content": [{"type": "text", "text": "A learner asks how to make a slow Python script run faster."}]},
+                  "usage": {"billed_units": {"input_tokens": 40, "output_tokens": 14}, "tokens": {"input_tokens": 40, "output_tokens": 14}}}},
+    ]
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if not isinstance(sys.exc_info()[1], ConnectionError): # Clients (e.g. killed workers) hanging up mid-keep-alive
+            super().handle_error(request, client_address)
+
+
+class ReplayServer:
+    """Threaded HTTP server answering from a cassette (or recording into one). Latency and errors are injected per upstream group;
+    `tail_rate` of requests get a further `tail_latency[group]` seconds, for slow-tail tests.
+    `ratelimit="unlimited"` rewrites Reddit's X-Ratelimit-* headers so client-side pacing doesn't dominate throughput runs;
+    `"recorded"` replays them as captured; `"enforced"` allows `budget` Reddit API requests per `window` seconds, like Reddit,
+    sending the live X-Ratelimit-* headers and answering 429 (counted in `stats["throttled"]`) once the budget is spent.
+    Subreddits named in `missing` are redirected to the search page, the way Reddit answers a name that doesn't exist."""
+
+    def __init__(self, interactions: Optional[list[dict[str, Any]]] = None, record: bool = False, host: str = "127.0.0.1", port: int = 0,
+                 latency: Optional[dict[str, float]] = None, jitter: float = 0.1, error_rate: float = 0.0, error_status: int = 503,
+                 ratelimit: str = "unlimited", budget: int = 100, window: float = 60.0, tail_rate: float = 0.0,
+                 tail_latency: Optional[dict[str, float]] = None, missing: Optional[set[str]] = None, seed: int = 0) -> None:
+        self.record = record
+        self.interactions: list[dict[str, Any]] = interactions if interactions is not None else ([] if record else synthetic_cassette())
+        self.latency: dict[str, float] = latency or {}
+        self.jitter = jitter
+        self.tail_rate = tail_rate
+        self.tail_latency: dict[str, float] = tail_latency or {}
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.ratelimit = ratelimit
+        self.budget = budget
+        self.window = window
+        self.missing: set[str] = {name.lower() for name in missing or ()}
+        self.stats: dict[str, int] = {"requests": 0, "reddit": 0, "cohere": 0, "injected_errors": 0, "misses": 0, "throttled": 0}
+
+        self._index: dict[str, list[dict[str, Any]]] = {}
+        for interaction in self.interactions:
+            self._index.setdefault(interaction_key(interaction["method"], interaction["path"]), []).append(interaction)
+        self._cursor: dict[str, int] = {}
+        self._random = random.Random(seed)
+        self._window_started: float = time.monotonic()
+        self._window_used: int = 0
+        self._lock = threading.Lock()
+        self._upstream: Optional[httpx.Client] = httpx.Client(timeout=30) if record else None
+        self._httpd = _HTTPServer((host, port), self._handler_class())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "ReplayServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="replay-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._upstream is not None:
+            self._upstream.close()
+
+    def reset_stats(self) -> None:
+        """Zero the counters and start a fresh rate-limit window."""
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+            self._window_started, self._window_used = time.monotonic(), 0
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            path.write_text(json.dumps({"interactions": self.interactions}, indent=1), encoding="utf-8")
+
+    @staticmethod
+    def load(path: Path) -> list[dict[str, Any]]:
+        return json.loads(path.read_text(encoding="utf-8"))["interactions"]
+
+    def respond(self, method: str, target: str, headers: dict[str, str], body: bytes) -> tuple[int, dict[str, str], bytes]:
+        """Status, headers and body for one request."""
+        parts = urlsplit(target)
+        group, base = upstream(parts.path)
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats[group] += 1
+            inject: bool = self._random.random() < self.error_rate
+            delay: float = self.latency.get(group, 0.0) * (1 + self._random.uniform(-self.jitter, self.jitter))
+            if self._random.random() < self.tail_rate:
+                delay += self.tail_latency.get(group, 0.0)
+        time.sleep(max(delay, 0.0))
+
+        if self.record:
+            return self._forward(method, base + target, parts.path, headers, body)
+        budget_headers: Optional[dict[str, str]] = self._spend() if self.ratelimit == "enforced" and group == "reddit" and "access_token" not in parts.path else None
+        if budget_headers is not None and float(budget_headers["x-ratelimit-remaining"]) < 0:
+            budget_headers.update({"x-ratelimit-remaining": "0", "retry-after": budget_headers["x-ratelimit-reset"]})
+            return 429, budget_headers, json.dumps({"message": "Too Many Requests", "error": 429}).encode()
+        if inject:
+            with self._lock:
+                self.stats["injected_errors"] += 1
+            error_headers: dict[str, str] = {"retry-after": "1", **UNLIMITED_RATELIMIT} if self.error_status == 429 else {}
+            return self.error_status, error_headers, json.dumps({"message": "injected error", "error": self.error_status}).encode()
+
+        subreddit: Optional[re.Match] = re.match(r"^/r/([^/]+)", parts.path)
+        if subreddit is not None and subreddit.group(1).lower() in self.missing:
+            return 302, {"location": f"https://www.reddit.com/subreddits/search.json?q={subreddit.group(1)}"}, b""
+
+        interaction: Optional[dict[str, Any]] = self._next(interaction_key(method, parts.path))
+        if interaction is None:
+            with self._lock:
+                self.stats["misses"] += 1
+            return 404, {}, json.dumps({"message": f"{method} {parts.path} is not in the cassette", "error": 404}).encode()
+
+        payload: Any = interaction["body"]
+        if isinstance(payload, dict) and payload.get("kind") == "Listing":
+            payload = _page(payload, parse_qs(parts.query))
+        response_headers: dict[str, str] = dict(interaction["headers"])
+        if self.ratelimit == "unlimited" and "x-ratelimit-remaining" in response_headers:
+            response_headers.update(UNLIMITED_RATELIMIT)
+        if budget_headers is not None:
+            response_headers.update(budget_headers)
+        content: bytes = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+        return interaction["status"], response_headers, content
+
+    def _spend(self) -> dict[str, str]:
+        """Count one request against the enforced budget; its X-Ratelimit-* headers, with a negative remaining once it's over."""
+        now: float = time.monotonic()
+        with self._lock:
+            if now - self._window_started >= self.window:
+                self._window_started, self._window_used = now, 0
+            self._window_used += 1
+            remaining: int = self.budget - self._window_used
+            if remaining < 0:
+                self.stats["throttled"] += 1
+            reset: int = max(1, int(self._window_started + self.window - now + 0.999))
+        return {"x-ratelimit-remaining": f"{remaining}.0", "x-ratelimit-used": str(self._window_used), "x-ratelimit-reset": str(reset)}
+
+    def _next(self, key: str) -> Optional[dict[str, Any]]:
+        """Recorded interactions for `key`, in turn."""
+        matches: Optional[list[dict[str, Any]]] = self._index.get(key)
+        if not matches:
+            return None
+        with self._lock:
+            position: int = self._cursor.get(key, 0)
+            self._cursor[key] = position + 1
+        return matches[position % len(matches)]
+
+    def _forward(self, method: str, url: str, path: str, headers: dict[str, str], body: bytes) -> tuple[int, dict[str, str], bytes]:
+        """Send the request upstream and keep a scrubbed copy of the response. Request bodies (credentials, prompts) are never stored."""
+        forwarded: dict[str, str] = {name: value for name, value in headers.items() if name.lower() not in HOP_HEADERS | {"host", "accept-encoding"}}
+        response: httpx.Response = self._upstream.request(method, url, headers=forwarded, content=body) # type: ignore[union-attr]
+        kept: dict[str, str] = {name.lower(): value for name, value in response.headers.items() if name.lower() not in HOP_HEADERS}
+        try:
+            payload: Any = response.json()
+        except ValueError:
+            payload = response.text
+        interaction: dict[str, Any] = {"method": method, "path": path, "status": response.status_code, "headers": kept, "body": _scrub(path, payload)}
+        with self._lock:
+            self.interactions.append(interaction)
+            self._index.setdefault(interaction_key(method, path), []).append(interaction)
+        return response.status_code, kept, response.content
+
+    def _handler_class(self) -> type[BaseHTTPRequestHandler]:
+        server: ReplayServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1" # Keep-alive, as PRAW's and Cohere's sessions expect
+
+            def _handle(self) -> None:
+                body: bytes = self.rfile.read(int(self.headers.get("content-length") or 0))
+                status, headers, content = server.respond(self.command, self.path, dict(self.headers.items()), body)
+                self.send_response(status)
+                headers.setdefault("content-type", "application/json; charset=UTF-8")
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("content-length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass # One line per request would swamp benchmark output
+
+        return Handler
+
+
+def _page(listing: dict[str, Any], query: dict[str, list[str]]) -> dict[str, Any]:
+    """Serve a recorded listing the way Reddit pages one: children after the `after` fullname, at most `limit` of them, with the next cursor."""
+    children: list[dict[str, Any]] = listing["data"]["children"]
+    start: int = 0
+    if "after" in query:
+        names: list[str] = [child["data"].get("name") for child in children]
+        start = names.index(query["after"][0]) + 1 if query["after"][0] in names else len(children)
+    end: int = start + int(query.get("limit", ["25"])[0])
+    page: list[dict[str, Any]] = children[start:end]
+    after: Optional[str] = page[-1]["data"].get("name") if page and end < len(children) else None
+    return {**listing, "data": {**listing["data"], "children": page, "dist": len(page), "after": after}}
+
+def _scrub(path: str, payload: Any) -> Any:
+    """Drop tokens and account details from a recorded response body."""
+    if path.startswith("/api/v1/me") and isinstance(payload, dict):
+        return {"name": "recorded-user", "id": payload.get("id", "")}
+    if isinstance(payload, dict):
+        return {key: "recorded-token" if key in SECRET_FIELDS else value for key, value in payload.items()}
+    return payload
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--record", type=Path, help="Proxy to the real upstreams and save interactions to this cassette on exit")
+    mode.add_argument("--cassette", type=Path, help="Cassette to replay (default: synthetic)")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--reddit-latency", type=float, default=0.0, help="Seconds added to every Reddit response")
+    parser.add_argument("--cohere-latency", type=float, default=0.0, help="Seconds added to every Cohere response")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fraction of requests given the extra tail latency below")
+    parser.add_argument("--cohere-tail-latency", type=float, default=0.0, help="Extra seconds for tail Cohere responses")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of replayed requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--ratelimit", choices=("unlimited", "recorded", "enforced"), default="unlimited")
+    parser.add_argument("--budget", type=int, default=100, help="Reddit requests allowed per --window with --ratelimit enforced")
+    parser.add_argument("--window", type=float, default=60.0)
+    args = parser.parse_args()
+
+    replay = ReplayServer(
+        ReplayServer.load(args.cassette) if args.cassette else None, record=args.record is not None, port=args.port,
+        latency={"reddit": args.reddit_latency, "cohere": args.cohere_latency}, error_rate=args.error_rate, error_status=args.error_status,
+        ratelimit=args.ratelimit, budget=args.budget, window=args.window, tail_rate=args.tail_rate, tail_latency={"cohere": args.cohere_tail_latency},
+    ).start()
+    print(f"{'Recording' if args.record else 'Replaying'} on {replay.url}; point REDDIT_OAUTH_URL, REDDIT_URL and CO_API_URL here. Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        replay.stop()
+        if args.record:
+            replay.save(args.record)
+            print(f"Saved {len(replay.interactions)} interactions to {args.record}")
+        print(f"Stats: {replay.stats}")
+
+    print("\n🐬")
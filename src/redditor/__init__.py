@@ -1,2 +1,6 @@
-from .main import create_client, fetch_latest_posts
-from .ai import expound_title
\ No newline at end of file
+from .main import create_client, get_client, fetch_latest_posts, fetch_many_posts
+from .aio import create_async_client, get_async_client, afetch_posts, afetch_latest_posts, afetch_many_posts
+from .ai import expound_title, expound_titles, expound_titles_batched, aexpound_title, aexpound_titles
+from .watch import SubredditWatcher
+from .backfill import iter_posts, aiter_posts, resume_cursor
+from .models import Post
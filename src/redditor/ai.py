@@ -1,29 +1,325 @@
 import os
-from typing import Optional
+import json
+import asyncio
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
 import cohere
 import dotenv
 from pathlib import Path
 
+from redditor.breaker import CircuitBreaker, CircuitOpenError
+from redditor.metrics import ERRORS, span, timed
 
-DOTENV_FILE: Path = Path(__file__).parent.parent.parent / ".env" 
+logger: logging.Logger = logging.getLogger(__name__)
+
+DOTENV_FILE: Path = Path(__file__).parent.parent.parent / ".env"
 dotenv.load_dotenv(DOTENV_FILE, override=True) # Load environment variables from .env file
 
 COHERE_API_KEY: str = os.getenv("COHERE_API_KEY", "")
 co = cohere.ClientV2(COHERE_API_KEY)
+aco = cohere.AsyncClientV2(COHERE_API_KEY) # For the server's event loop
+
+# -- Model & prompt; every one of these feeds the cache key, so changing any of them invalidates cached expansions
+MODEL: str = "command-a-03-2025"
+PROMPT_TEMPLATE: str = "Expound on this this Reddit post title in one short paragraph:\n{title}"
+MAX_TOKENS: int = 64
+TEMPERATURE: float = 0.5
+BATCH_PROMPT_TEMPLATE: str = (
+    "Expound on each of these Reddit post titles in one short paragraph each.\n"
+    "Reply with only a JSON array of objects like {{\"i\": <title number>, \"text\": \"<paragraph>\"}}, one per title.\n\n{titles}"
+)
+MODEL_MAX_OUTPUT_TOKENS: int = 8000 # command-a-03-2025's output cap; bounds how many titles fit in one batched reply
+BATCH_OVERHEAD_TOKENS: int = 16 # JSON framing per title in a batched reply
+
+# -- Expansion stage tuning
+EXPOUND_MAX_WORKERS: int = int(os.getenv("EXPOUND_MAX_WORKERS", "8")) # Max concurrent Cohere calls per `expound_titles`
+EXPOUND_TIMEOUT: float = float(os.getenv("EXPOUND_TIMEOUT", "15")) # Per-call timeout, in seconds
+EXPOUND_BATCH_SIZE: int = int(os.getenv("EXPOUND_BATCH_SIZE", "10")) # Titles per call in `expound_titles_batched`
+
+# -- Expansion cache
+CACHE_FILE: Path = Path(os.getenv("EXPOUND_CACHE_FILE") or Path(__file__).parent.parent.parent / ".cache" / "expound.sqlite3")
+CACHE_TTL: float = float(os.getenv("EXPOUND_CACHE_TTL", str(7 * 24 * 60 * 60))) # seconds
+CACHE_MEMORY_ENTRIES: int = int(os.getenv("EXPOUND_CACHE_MEMORY_ENTRIES", "1024"))
+CACHE_DISK_ENTRIES: int = int(os.getenv("EXPOUND_CACHE_DISK_ENTRIES", "100000"))
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+def cache_key(title: str, model: str = MODEL, prompt_template: str = PROMPT_TEMPLATE, max_tokens: int = MAX_TOKENS, temperature: float = TEMPERATURE) -> str:
+    """Content address of an expansion: a SHA-256 over everything that shapes the model's output."""
+    payload: str = json.dumps([model, prompt_template, title, max_tokens, temperature], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ExpansionCache:
+    """Two-tier cache of expanded titles: an in-process LRU in front of a SQLite store that survives restarts.
+    Entries expire after `ttl` seconds; each tier evicts least-recently-used entries past its size limit.
+    `aget`/`aset` are for the event loop: the memory tier is used inline and SQLite only ever on a thread.
+    SQLite errors (e.g. `database is locked` with several workers on one file) degrade to a miss or a memory-only write; the cache never raises."""
+
+    _EVICT_EVERY: int = 64 # Disk size checks run once per this many writes
+
+    def __init__(self, path: Optional[Path] = CACHE_FILE, ttl: float = CACHE_TTL, memory_entries: int = CACHE_MEMORY_ENTRIES, disk_entries: int = CACHE_DISK_ENTRIES) -> None:
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.stats: dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict() # key -> (text, stored_at)
+        self._lock = threading.Lock() # Memory tier and stats; never held across a SQLite call, so the event loop can take it
+        self._db_lock = threading.Lock()
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS expansions (key TEXT PRIMARY KEY, text TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS expansions_accessed_at ON expansions (accessed_at)")
+
+    def get(self, key: str, count_miss: bool = True) -> Optional[str]:
+        """`count_miss=False` for a lookup the caller follows with another key, so one miss isn't counted twice."""
+        text: Optional[str] = self._get_memory(key)
+        if text is None and self._db is not None:
+            text = self._get_disk(key)
+        if text is None and count_miss:
+            self._count("misses")
+        return text
+
+    async def aget(self, key: str) -> Optional[str]:
+        text: Optional[str] = self._get_memory(key)
+        if text is None and self._db is not None:
+            text = await asyncio.to_thread(self._get_disk, key)
+        if text is None:
+            self._count("misses")
+        return text
+
+    def set(self, key: str, text: str) -> None:
+        now: float = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+        if self._db is not None:
+            self._set_disk(key, text, now)
+
+    async def aset(self, key: str, text: str) -> None:
+        now: float = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+        if self._db is not None:
+            await asyncio.to_thread(self._set_disk, key, text, now)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM expansions")
+
+    def _count(self, event: str, n: int = 1) -> None:
+        with self._lock:
+            self.stats[event] += n
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry: Optional[tuple[str, float]] = self._memory.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[1] < self.ttl:
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[0]
+            del self._memory[key]
+            self.stats["expirations"] += 1
+            return None
+
+    def _get_disk(self, key: str) -> Optional[str]:
+        assert self._db is not None
+        now: float = time.time()
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT text, stored_at FROM expansions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                if now - row[1] >= self.ttl:
+                    self._db.execute("DELETE FROM expansions WHERE key = ?", (key,))
+                    self._count("expirations")
+                    return None
+                self._db.execute("UPDATE expansions SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            logger.warning(f"🟡 Expansion cache read failed; treating as a miss: {e}")
+            return None
+        with self._lock:
+            self._remember(key, row[0], row[1])
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+        return row[0]
+
+    def _set_disk(self, key: str, text: str, now: float) -> None:
+        assert self._db is not None
+        try:
+            with self._db_lock:
+                self._db.execute("INSERT OR REPLACE INTO expansions (key, text, stored_at, accessed_at) VALUES (?, ?, ?, ?)", (key, text, now, now))
+                self._writes += 1
+                if self._writes % self._EVICT_EVERY == 0:
+                    self._evict_disk(now)
+        except sqlite3.Error as e: # Already in the memory tier
+            logger.warning(f"🟡 Expansion cache write failed; kept in memory only: {e}")
+
+    def _remember(self, key: str, text: str, stored_at: float) -> None:
+        """Put an entry in the memory tier, evicting the least-recently-used entry past `memory_entries`. Caller holds `_lock`."""
+        self._memory[key] = (text, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now: float) -> None:
+        """Drop expired rows, then the least-recently-used rows past `disk_entries`. Caller holds `_db_lock`."""
+        assert self._db is not None
+        expired: int = self._db.execute("DELETE FROM expansions WHERE stored_at <= ?", (now - self.ttl,)).rowcount
+        self._count("expirations", max(expired, 0))
+        overflow: int = self._db.execute("SELECT COUNT(*) FROM expansions").fetchone()[0] - self.disk_entries
+        if overflow > 0:
+            self._db.execute("DELETE FROM expansions WHERE key IN (SELECT key FROM expansions ORDER BY accessed_at LIMIT ?)", (overflow,))
+            self._count("evictions", overflow)
+
 
-def expound_title(title: str) -> Optional[str]:
+cache = ExpansionCache()
+breaker = CircuitBreaker("cohere") # Every Cohere call goes through this; while it's open, expansions are skipped (cached ones are still served)
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+@timed("expound_title")
+def expound_title(title: str, timeout: Optional[float] = EXPOUND_TIMEOUT) -> Optional[str]:
+    key: str = cache_key(title)
+    cached: Optional[str] = cache.get(key)
+    if cached is not None:
+        return cached
+
+    try:
+        with span("cohere_chat"):
+            response: cohere.Generation = breaker.call(lambda: co.chat(
+                model=MODEL,
+                messages=[{"role": "user","content": PROMPT_TEMPLATE.format(title=title)}],
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                request_options={"timeout_in_seconds": timeout} if timeout else None,
+            ))
+        expounded: str = response.model_dump()["message"]["content"][0]["text"].strip()
+        cache.set(key, expounded)
+        return expounded
+
+    except CircuitOpenError:
+        return None # Cohere is failing; don't wait out another timeout
+    except Exception as e:
+        logger.warning(f"🟡 Error generating expounded title: {e}")
+        ERRORS.inc(operation="expound_title", error=type(e).__name__)
+        return None
+
+def expound_titles(titles: list[str], max_workers: int = EXPOUND_MAX_WORKERS, timeout: Optional[float] = EXPOUND_TIMEOUT) -> list[Optional[str]]:
+    """Expound many titles over a bounded thread pool. Results keep the order of `titles`; failed or timed-out calls give `None`."""
+    if not titles:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(titles))), thread_name_prefix="expound") as pool:
+        return list(pool.map(lambda title: expound_title(title, timeout=timeout), titles))
+
+def max_batch_size(max_tokens: int = MAX_TOKENS, output_limit: int = MODEL_MAX_OUTPUT_TOKENS) -> int:
+    """Most titles one batched call can answer without its reply (`max_tokens` per title plus JSON framing) overrunning the model's output cap."""
+    return max(1, output_limit // (max_tokens + BATCH_OVERHEAD_TOKENS))
+
+def parse_batch_reply(text: str, count: int) -> dict[int, str]:
+    """Pull {title index: paragraph} out of a batched reply; tolerates prose or code fences around the JSON array. Raises `ValueError` if there's no usable array."""
+    start, end = text.find("["), text.rfind("]")
+    if start == -1 or end < start:
+        raise ValueError("No JSON array in batched reply")
+    items: Any = json.loads(text[start:end + 1])
+    if not isinstance(items, list):
+        raise ValueError("Batched reply is not a JSON array")
+    return {int(item["i"]) - 1: str(item["text"]).strip() for item in items if isinstance(item, dict) and str(item.get("i", "")).isdigit() and 0 < int(item["i"]) <= count and item.get("text")}
+
+def _expound_batch(titles: list[str], timeout: Optional[float]) -> list[Optional[str]]:
+    """One Cohere call for `titles`; any title missing from the parsed reply is `None`."""
     try:
-        response: cohere.Generation = co.chat(
-            model='command-a-03-2025',
-            messages=[{"role": "user","content": f"Expound on this this Reddit post title in one short paragraph:\n{title}"}],
-            max_tokens=64,
-            temperature=0.5
-        )
-        return response.model_dump()["message"]["content"][0]["text"].strip()
-    
+        numbered: str = "\n".join(f"{i}. {title}" for i, title in enumerate(titles, start=1))
+        with span("cohere_chat_batch"):
+            response: cohere.Generation = breaker.call(lambda: co.chat(
+                model=MODEL,
+                messages=[{"role": "user","content": BATCH_PROMPT_TEMPLATE.format(titles=numbered)}],
+                max_tokens=min(len(titles) * (MAX_TOKENS + BATCH_OVERHEAD_TOKENS), MODEL_MAX_OUTPUT_TOKENS),
+                temperature=TEMPERATURE,
+                request_options={"timeout_in_seconds": timeout} if timeout else None,
+            ))
+        parsed: dict[int, str] = parse_batch_reply(response.model_dump()["message"]["content"][0]["text"], len(titles))
     except Exception as e:
-        print(f"Error generating expounded title: {e}")
-        return None        
+        logger.warning(f"🟡 Error generating batched expansions; falling back to per-title calls: {e}")
+        parsed = {}
+    return [parsed.get(i) for i in range(len(titles))]
+
+def expound_titles_batched(titles: list[str], batch_size: int = EXPOUND_BATCH_SIZE, max_workers: int = EXPOUND_MAX_WORKERS, timeout: Optional[float] = EXPOUND_TIMEOUT) -> list[Optional[str]]:
+    """Expound many titles, packing up to `batch_size` uncached titles into each Cohere call (capped by `max_batch_size()`).
+    Titles a batch fails to answer, or whose reply can't be parsed, fall back to per-title `expound_title` calls. Results keep the order of `titles`."""
+    results: list[Optional[str]] = [cache.get(cache_key(title, prompt_template=BATCH_PROMPT_TEMPLATE), count_miss=False) or cache.get(cache_key(title)) for title in titles]
+    pending: list[int] = [i for i, result in enumerate(results) if result is None]
+    if not pending:
+        return results
+
+    size: int = max(1, min(batch_size, max_batch_size()))
+    batches: list[list[int]] = [pending[start:start + size] for start in range(0, len(pending), size)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches))), thread_name_prefix="expound-batch") as pool:
+        for batch, expansions in zip(batches, pool.map(lambda batch: _expound_batch([titles[i] for i in batch], timeout), batches)):
+            for i, expounded in zip(batch, expansions):
+                if expounded is not None:
+                    results[i] = expounded
+                    cache.set(cache_key(titles[i], prompt_template=BATCH_PROMPT_TEMPLATE), expounded)
+
+    missing: list[int] = [i for i in pending if results[i] is None]
+    for i, expounded in zip(missing, expound_titles([titles[i] for i in missing], max_workers=max_workers, timeout=timeout)):
+        results[i] = expounded
+    return results
+
+@timed("expound_title")
+async def aexpound_title(title: str, timeout: Optional[float] = EXPOUND_TIMEOUT) -> Optional[str]:
+    """Async twin of `expound_title`, using the async Cohere client and the same cache (SQLite reads and writes on a thread)."""
+    key: str = cache_key(title)
+    cached: Optional[str] = await cache.aget(key)
+    if cached is not None:
+        return cached
+
+    try:
+        with span("cohere_chat"):
+            response = await breaker.acall(lambda: aco.chat(
+                model=MODEL,
+                messages=[{"role": "user","content": PROMPT_TEMPLATE.format(title=title)}],
+                max_tokens=MAX_TOKENS,
+                temperature=TEMPERATURE,
+                request_options={"timeout_in_seconds": timeout} if timeout else None,
+            ))
+        expounded: str = response.model_dump()["message"]["content"][0]["text"].strip()
+        await cache.aset(key, expounded)
+        return expounded
+
+    except CircuitOpenError:
+        return None
+    except Exception as e:
+        logger.warning(f"🟡 Error generating expounded title: {e}")
+        ERRORS.inc(operation="expound_title", error=type(e).__name__)
+        return None
+
+async def aexpound_titles(titles: list[str], max_concurrency: int = EXPOUND_MAX_WORKERS, timeout: Optional[float] = EXPOUND_TIMEOUT) -> list[Optional[str]]:
+    """Async twin of `expound_titles`: at most `max_concurrency` calls in flight, results in the order of `titles`."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def bounded(title: str) -> Optional[str]:
+        async with semaphore:
+            return await aexpound_title(title, timeout=timeout)
+
+    return list(await asyncio.gather(*(bounded(title) for title in titles)))
 
 
 if __name__ == "__main__":
@@ -31,5 +327,7 @@ if __name__ == "__main__":
     expounded = expound_title(title)
     print(f"Original Title: {title}")
     print(f"Expounded Title: {expounded}")
-    
-    print("🐬")
\ No newline at end of file
+    print(f"Cache stats: {cache.stats}")
+    print(f"Breaker: {breaker.state}, {breaker.stats}")
+
+    print("🐬")
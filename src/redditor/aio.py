@@ -0,0 +1,251 @@
+"""Reddit Automation with Async PRAW, for use on an event loop (e.g. the FastAPI server)"""
+
+# Async PRAW: https://asyncpraw.readthedocs.io/en/stable/
+# Mirrors `redditor.main`; the sync API there stays for the CLI.
+
+import asyncio
+import logging
+import time
+from typing import Any, Optional
+
+from asyncpraw import Reddit
+from asyncpraw.models.reddit.redditor import Redditor
+from asyncprawcore.exceptions import (
+    OAuthException, Redirect, RequestException,
+    ResponseException, ServerError, Forbidden,
+    NotFound, TooManyRequests
+    )
+
+from redditor.ai import aexpound_titles
+from redditor.archive import archive_posts
+from redditor.listing import SubredditNotFound, afetch_listing, subreddits
+from redditor.metrics import ERRORS, RETRIES, span, timed
+from redditor.models import Post, apply_expansions, titles
+from redditor.ratelimit import AsyncRateLimitedRequestor, backoff_delay, retry_after_seconds
+from redditor.main import REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT, REDDIT_USERNAME, REDDIT_PASSWORD, REDDIT_OAUTH_URL, REDDIT_URL, REDDIT_VERIFY_LOGIN, BATCH_MAX_WORKERS, ClientManager
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+@timed("create_client")
+async def create_async_client(verify: bool = True) -> Reddit:
+    """Create a Reddit client using the `asyncpraw` library. Must be called from a running event loop; close it with `await reddit.close()`.
+    With `verify=False`, skip the `user.me()` probe; Async PRAW then authenticates on the first real request."""
+    attempts = 0
+
+    retries = 3 # Set the number of retries
+
+    while attempts < retries:
+        reddit = Reddit(
+            client_id=REDDIT_CLIENT_ID,
+            client_secret=REDDIT_CLIENT_SECRET,
+            user_agent=REDDIT_USER_AGENT,
+            username=REDDIT_USERNAME,
+            password=REDDIT_PASSWORD,
+            oauth_url=REDDIT_OAUTH_URL,
+            reddit_url=REDDIT_URL,
+            requestor_class=AsyncRateLimitedRequestor,  # Paces every request through the shared scheduler
+        )
+        try:
+            if not verify:
+                logger.info("⚪ Async Reddit client created; authentication deferred to first request.")
+                return reddit
+
+            logger.info("⚪ Authenticating async Reddit client...")
+            user: Optional[Redditor] = await reddit.user.me()  # Raises on failure
+            logger.info(f"🟢 Async Reddit client authenticated as: {user.name}")  # type: ignore
+
+            return reddit
+
+        except OAuthException as e:
+            logger.error(f"🔴 Invalid credentials: {e}", exc_info=True)
+            await reddit.close()
+            break  # Don't retry on bad creds
+
+        except (RequestException, ResponseException, ServerError, TooManyRequests) as e:
+            logger.warning(f"🟡 Network/API error on attempt {attempts+1}/{retries}: {str(e)}")
+            RETRIES.inc(operation="create_client")
+            await reddit.close()
+            await asyncio.sleep(backoff_delay(attempts, retry_after_seconds(e)))
+            attempts += 1
+
+        except Forbidden as e: # type: ignore
+            logger.error("🔴 Access forbidden when authenticating: %s", str(e), exc_info=True)
+            await reddit.close()
+            break
+
+        except Exception as e:
+            logger.error("🔴 Unexpected error during client creation: %s", str(e), exc_info=True)
+            await reddit.close()
+            break
+
+    logger.error("🔴 Failed to authenticate async Reddit client after %d attempts.", retries)
+    ERRORS.inc(operation="create_client", error="AuthenticationFailed")
+    raise RuntimeError("Reddit client authentication failed.")
+
+_async_client: Optional[Reddit] = None
+_async_client_lock = asyncio.Lock()
+_async_refresher: Optional["asyncio.Task[None]"] = None
+
+async def get_async_client() -> Reddit:
+    """Shared async client for the current event loop, created and authenticated on first use rather than at startup.
+    Once created, a background task refreshes the OAuth token shortly before it expires, as `ClientManager` does."""
+    global _async_client, _async_refresher
+    if _async_client is None:
+        async with _async_client_lock:
+            if _async_client is None:
+                _async_client = await create_async_client(verify=REDDIT_VERIFY_LOGIN)
+                _async_refresher = asyncio.create_task(_refresh_loop(_async_client), name="reddit-token-refresh")
+    return _async_client
+
+async def close_async_client() -> None:
+    """Stop the token refresher and close the shared async client, if one was created."""
+    global _async_client, _async_refresher
+    if _async_refresher is not None:
+        _async_refresher.cancel()
+        try:
+            await _async_refresher
+        except asyncio.CancelledError:
+            pass
+        _async_refresher = None
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+
+async def reset_async_client() -> None:
+    """Drop the shared async client (e.g. after rotating credentials); the next `get_async_client()` creates a fresh one."""
+    async with _async_client_lock:
+        await close_async_client()
+
+def _seconds_until_expiry(authorizer: Any) -> Optional[float]:
+    """Seconds left on `authorizer`'s token, `None` before it has one. asyncprawcore internals; no public API for this:
+    2.x keeps a wall-clock `_expiration_timestamp`, later releases a monotonic `_expiration_timestamp_ns`."""
+    expires_at_ns: Optional[int] = getattr(authorizer, "_expiration_timestamp_ns", None)
+    if expires_at_ns:
+        return (expires_at_ns - time.monotonic_ns()) / 1e9
+    expires_at: Optional[float] = getattr(authorizer, "_expiration_timestamp", None)
+    return expires_at - time.time() if expires_at else None
+
+async def _refresh_loop(reddit: Reddit) -> None:
+    while True:
+        authorizer = reddit._core._authorizer
+        expires_in: Optional[float] = _seconds_until_expiry(authorizer)
+        await asyncio.sleep(max(expires_in - ClientManager.REFRESH_MARGIN, 1) if expires_in is not None else ClientManager.REFRESH_MARGIN)
+        if expires_in is None:
+            continue # Not authenticated yet (deferred verification); check again later
+        try:
+            await authorizer.refresh()
+            logger.debug("🔄 Refreshed async Reddit OAuth token in the background.")
+        except Exception as e:
+            logger.warning(f"🟡 Background token refresh failed; Async PRAW will refresh on the next request: {e}")
+
+@timed("fetch_latest_posts")
+async def afetch_posts(reddit: Optional[Reddit] = None, subreddit_name: str = "politics", limit: int = 5, validate: bool = True, expound: bool = True) -> list[Post]:
+    """Fetch the latest `limit` posts from the specified subreddit as `Post` records, using the shared async client unless `reddit` is given.
+    With `expound=False`, return the listing straight away with `expounded` left as `None`, for callers that expand titles themselves (or don't need them)."""
+    reddit = reddit or await get_async_client()
+    attempts = 0
+    retries = 3
+
+    while attempts < retries:
+        try:
+            logger.info(f"⚪ Fetching latest posts from r/{subreddit_name}...")
+            with span("reddit_listing"):
+                posts: list[Post] = (await afetch_listing(reddit, subreddit_name, limit, validate=validate))[0] # Raises asyncprawcore.exceptions.Redirect if invalid
+
+            # Expand titles concurrently once the listing is in; order follows the listing
+            apply_expansions(posts, await aexpound_titles(titles(posts)) if expound else None)
+
+            await asyncio.to_thread(archive_posts, posts) # SQLite write off the event loop
+            logger.info(f"🟢 Fetched {len(posts)} latest posts from r/{subreddit_name}")
+            return posts
+
+        except Redirect:
+            logger.error(f"🔴 Subreddit r/{subreddit_name} does not exist (redirected).")
+            break
+
+        except SubredditNotFound as e:
+            logger.error(f"🔴 {e}")
+            break
+
+        except (RequestException, ResponseException, ServerError, TooManyRequests) as e:
+            logger.warning(f"🟡 Network/API error on attempt {attempts + 1}/{retries}: {e}")
+            RETRIES.inc(operation="fetch_latest_posts")
+            await asyncio.sleep(backoff_delay(attempts, retry_after_seconds(e)))
+            attempts += 1
+
+        except (Forbidden, NotFound) as e: # type: ignore
+            logger.error(f"🔴 Access issue: r/{subreddit_name} - {e}")
+            break
+
+        except Exception as e:
+            logger.error(f"🔴 Unexpected error fetching posts: {e}", exc_info=True)
+            break
+
+    logger.error(f"🔴 Failed to fetch posts from r/{subreddit_name} after {retries} retries.")
+    ERRORS.inc(operation="fetch_latest_posts", error="FetchFailed")
+    return []
+
+async def afetch_latest_posts(reddit: Optional[Reddit] = None, subreddit_name: str = "politics", limit: int = 5, validate: bool = True, expound: bool = True) -> list[dict[str, Any]]:
+    """Async twin of `redditor.main.fetch_latest_posts`: `afetch_posts` as a list of dictionaries containing post details."""
+    return [post.as_dict() for post in await afetch_posts(reddit, subreddit_name, limit, validate, expound)]
+
+async def avalidate_subreddits(subreddit_names: list[str], reddit: Optional[Reddit] = None) -> dict[str, str]:
+    """Async twin of `redditor.main.validate_subreddits`."""
+    reddit = reddit or await get_async_client()
+    existing: dict[str, str] = {subreddit.display_name.lower(): subreddit.display_name async for subreddit in reddit.info(subreddits=subreddit_names)}
+    for name in subreddit_names:
+        subreddits.mark(name, exists=name.lower() in existing)
+    return existing
+
+async def afetch_many_posts(subreddit_names: list[str], reddit: Optional[Reddit] = None, limit: int = 5, max_concurrency: int = BATCH_MAX_WORKERS) -> dict[str, dict[str, Any]]:
+    """Async twin of `redditor.main.fetch_many_posts`. Returns {name: {"posts": [...], "error": Optional[str]}}, in input order."""
+    reddit = reddit or await get_async_client()
+    names: list[str] = list(dict.fromkeys(name.strip() for name in subreddit_names if name.strip())) # De-duplicate, keep order
+    results: dict[str, dict[str, Any]] = {name: {"posts": [], "error": None} for name in names}
+
+    try:
+        existing: dict[str, str] = await avalidate_subreddits(names, reddit)
+    except Exception as e:
+        logger.error(f"🔴 Failed to validate subreddits {names}: {e}", exc_info=True)
+        for result in results.values():
+            result["error"] = f"Validation failed: {e}"
+        return results
+
+    valid: list[str] = [name for name in names if name.lower() in existing]
+    for name in names:
+        if name.lower() not in existing:
+            logger.error(f"🔴 Subreddit r/{name} does not exist.")
+            results[name]["error"] = "Subreddit does not exist"
+
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def bounded(name: str) -> list[dict[str, Any]]:
+        async with semaphore:
+            return await afetch_latest_posts(reddit, name, limit, validate=False)
+
+    logger.info(f"⚪ Fetching latest posts from {len(valid)} subreddits...")
+    for name, posts in zip(valid, await asyncio.gather(*(bounded(name) for name in valid))):
+        results[name]["posts"] = posts
+        if not posts:
+            results[name]["error"] = "No posts fetched; see logs"
+
+    return results
+
+
+if __name__ == "__main__":
+    from pprint import pprint
+
+    async def main() -> None:
+        try:
+            subreddit_name: str = input("Enter subreddit name (default: politics): ") or "politics"
+            latest_posts: list[dict[str, Any]] = await afetch_latest_posts(subreddit_name=subreddit_name)
+            pprint(f"Latest {len(latest_posts)} posts from r/{subreddit_name}: ")
+            [pprint(i) for i in latest_posts]
+        finally:
+            await close_async_client()
+
+    asyncio.run(main())
+
+    print("\n🐬")
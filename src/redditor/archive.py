@@ -0,0 +1,136 @@
+"""Local archive of every fetched post, for answering historical questions without going back to Reddit"""
+
+# SQLite FTS5: https://www.sqlite.org/fts5.html
+# Posts are keyed by id: re-fetching one refreshes its score (and fills in its expansion if it was missing) but never
+# deletes anything. Titles are full-text indexed through an external-content FTS5 table kept in sync by triggers.
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from redditor.models import Post
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+ARCHIVE_ENABLED: bool = os.getenv("ARCHIVE_ENABLED", "true").lower() not in ("0", "false", "no")
+ARCHIVE_FILE: Path = Path(os.getenv("ARCHIVE_FILE") or Path(__file__).parent.parent.parent / "data" / "archive.sqlite3")
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL COLLATE NOCASE,
+    created_utc REAL NOT NULL,
+    author TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    expounded TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_subreddit_created ON posts (subreddit, created_utc);
+CREATE INDEX IF NOT EXISTS posts_subreddit_score ON posts (subreddit, score);
+CREATE INDEX IF NOT EXISTS posts_author ON posts (author);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(title, content='posts', content_rowid='rowid');
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE OF title ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    INSERT INTO posts_fts (rowid, title) VALUES (new.rowid, new.title);
+END;
+"""
+
+UPSERT: str = """
+INSERT INTO posts (id, subreddit, created_utc, author, score, title, expounded, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET score = excluded.score, expounded = COALESCE(excluded.expounded, posts.expounded), fetched_at = excluded.fetched_at
+"""
+
+COLUMNS: str = "id, created_utc, score, author, title, subreddit, expounded" # `Post` field order
+
+
+class PostArchive:
+    """SQLite-backed post archive. `ingest()` writes each batch of posts in one transaction. Safe to share across threads."""
+
+    def __init__(self, path: Path = ARCHIVE_FILE) -> None:
+        self.path = path
+        self.stats: dict[str, int] = {"ingested": 0, "batches": 0}
+
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL") # WAL keeps this crash-safe; fsync per checkpoint rather than per commit
+        self._db.executescript(SCHEMA)
+
+    def ingest(self, posts: Iterable[Post]) -> None:
+        """Write `posts` now, in a single transaction."""
+        with self._lock:
+            self._write(list(posts))
+
+    def top(self, subreddit: str, n: int = 10, since: Optional[float] = None) -> list[Post]:
+        """Highest-scoring `n` posts in `subreddit` created at or after `since` (a Unix timestamp; default: the last day)."""
+        since = time.time() - 24 * 60 * 60 if since is None else since
+        return self._query(f"SELECT {COLUMNS} FROM posts WHERE subreddit = ? AND created_utc >= ? ORDER BY score DESC LIMIT ?", (subreddit, since, n))
+
+    def search(self, query: str, subreddit: Optional[str] = None, n: int = 20) -> list[Post]:
+        """Full-text search over titles (FTS5 query syntax), best matches first, optionally within one subreddit."""
+        sql: str = f"SELECT {', '.join('p.' + column.strip() for column in COLUMNS.split(','))} FROM posts_fts JOIN posts p ON p.rowid = posts_fts.rowid WHERE posts_fts MATCH ?"
+        params: tuple = (query,)
+        if subreddit:
+            sql, params = sql + " AND p.subreddit = ?", params + (subreddit,)
+        return self._query(sql + " ORDER BY rank LIMIT ?", params + (n,))
+
+    def by_author(self, author: str, n: int = 20) -> list[Post]:
+        return self._query(f"SELECT {COLUMNS} FROM posts WHERE author = ? ORDER BY created_utc DESC LIMIT ?", (author, n))
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _query(self, sql: str, params: tuple) -> list[Post]:
+        with self._lock:
+            return [Post(*row) for row in self._db.execute(sql, params)]
+
+    def _write(self, posts: list[Post]) -> None:
+        """Upsert `posts` in one transaction. Caller holds the lock."""
+        if not posts:
+            return
+        now: float = time.time()
+        try:
+            self._db.execute("BEGIN")
+            self._db.executemany(UPSERT, [(p.id, p.subreddit, p.created_utc, p.author, p.score, p.title, p.expounded, now) for p in posts])
+            self._db.execute("COMMIT")
+        except sqlite3.Error as e:
+            self._db.execute("ROLLBACK")
+            logger.error(f"🔴 Failed to archive {len(posts)} posts: {e}", exc_info=True)
+            return
+        self.stats["ingested"] += len(posts)
+        self.stats["batches"] += 1
+
+
+_archive: Optional[PostArchive] = None
+_archive_lock = threading.Lock()
+
+def get_archive() -> Optional[PostArchive]:
+    """Process-wide archive, opened on first use; `None` when `ARCHIVE_ENABLED` is off."""
+    global _archive
+    if not ARCHIVE_ENABLED:
+        return None
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = PostArchive()
+    return _archive
+
+def archive_posts(posts: Iterable[Post]) -> None:
+    """Ingest `posts` into the process-wide archive, if enabled. Never raises; archiving must not break a fetch."""
+    try:
+        archive: Optional[PostArchive] = get_archive()
+        if archive is not None:
+            archive.ingest(posts)
+    except Exception as e:
+        logger.error(f"🔴 Archiving failed: {e}", exc_info=True)
@@ -0,0 +1,184 @@
+"""Deep pagination: stream thousands of a subreddit's posts, page by page, with the next page fetched while the current one is consumed"""
+
+# Reddit listings: https://www.reddit.com/dev/api/#listings
+# Listings are cursor-paged (`after` = fullname of the last item), so page k+1 can't be requested before page k
+# arrives; "prefetch" means a background fetcher runs up to `prefetch` pages ahead of the consumer, overlapping Reddit
+# round-trips with expansion, archiving and whatever the caller does with each post. At most `prefetch + 2` pages are
+# held at once, so memory stays flat however large `limit` is. Every request goes through the shared rate-limit
+# scheduler, at the caller's priority. Reddit stops serving a listing after roughly 1000 items.
+
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+import contextvars
+from typing import Any, AsyncIterator, Callable, Generator, Iterator, Optional
+
+import praw
+import asyncpraw
+import prawcore
+import asyncprawcore
+
+from redditor.ai import aexpound_titles, expound_titles
+from redditor.aio import get_async_client
+from redditor.archive import archive_posts
+from redditor.listing import LISTING_PAGE_SIZE, afetch_listing, fetch_listing
+from redditor.main import get_client
+from redditor.metrics import RETRIES, span
+from redditor.models import Post, apply_expansions, titles
+from redditor.ratelimit import backoff_delay, retry_after_seconds
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+BACKFILL_PREFETCH: int = int(os.getenv("BACKFILL_PREFETCH", "2")) # Pages fetched ahead of the consumer; 0 fetches in line
+RETRIES_PER_PAGE: int = 3
+
+RETRYABLE: tuple[type[Exception], ...] = (
+    prawcore.RequestException, prawcore.ResponseException, prawcore.ServerError, prawcore.TooManyRequests,
+    asyncprawcore.RequestException, asyncprawcore.ResponseException, asyncprawcore.ServerError, asyncprawcore.TooManyRequests,
+)
+
+
+def resume_cursor(post: Post) -> str:
+    """The `after` value that continues a listing just past `post`."""
+    return f"t3_{post.id}"
+
+def _page_params(limit: Optional[int], fetched: int, cursor: Optional[str]) -> Optional[dict[str, Any]]:
+    """Listing parameters for the next page, or `None` once `limit` posts have been fetched."""
+    size: int = LISTING_PAGE_SIZE if limit is None else min(LISTING_PAGE_SIZE, limit - fetched)
+    if size <= 0:
+        return None
+    return {"limit": size, "after": cursor} if cursor else {"limit": size}
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+def _fetch_page(reddit: praw.Reddit, subreddit_name: str, params: dict[str, Any]) -> tuple[list[Post], Optional[str]]:
+    """One listing page and the cursor after it, retrying network/API errors with backoff. Raises on anything else (e.g. `Redirect`)."""
+    for attempt in range(RETRIES_PER_PAGE):
+        try:
+            with span("reddit_listing_page"):
+                return fetch_listing(reddit, subreddit_name, **params)
+        except RETRYABLE as e:
+            if attempt + 1 == RETRIES_PER_PAGE:
+                raise
+            logger.warning(f"🟡 Listing page for r/{subreddit_name} failed on attempt {attempt + 1}/{RETRIES_PER_PAGE}: {e}")
+            RETRIES.inc(operation="backfill_page")
+            time.sleep(backoff_delay(attempt, retry_after_seconds(e)))
+    raise AssertionError("unreachable")
+
+def iter_posts(subreddit_name: str, limit: Optional[int] = None, after: Optional[str] = None, reddit: Optional[praw.Reddit] = None,
+               prefetch: int = BACKFILL_PREFETCH, expound: bool = False, archive: bool = True) -> Iterator[Post]:
+    """Yield up to `limit` (default: all Reddit will list) of `subreddit_name`'s newest posts, newest first, starting after the `after` fullname.
+    To resume later, pass `after=resume_cursor(last_post_seen)`. With `expound`, each page's titles are expanded before it is yielded.
+    Raises what PRAW raises for a bad subreddit (e.g. `prawcore.Redirect`, or `listing.SubredditNotFound` once it's known to be bad)
+    or once a page has failed `RETRIES_PER_PAGE` times."""
+    reddit = reddit or get_client()
+
+    def pages() -> Generator[list[Post], None, None]:
+        cursor, fetched = after, 0
+        while (params := _page_params(limit, fetched, cursor)) is not None:
+            posts, cursor = _fetch_page(reddit, subreddit_name, params) # type: ignore[arg-type]
+            if posts:
+                yield posts
+            fetched += len(posts)
+            if not posts or cursor is None:
+                return
+
+    source: Generator[list[Post], None, None] = pages() if prefetch <= 0 else _prefetched(pages, prefetch, f"backfill-{subreddit_name}")
+    try:
+        for posts in source:
+            apply_expansions(posts, expound_titles(titles(posts)) if expound else None)
+            if archive:
+                archive_posts(posts)
+            yield from posts
+    finally:
+        source.close()
+
+def _prefetched(produce: Callable[[], Iterator[list[Post]]], depth: int, name: str) -> Generator[list[Post], None, None]:
+    """Run `produce` on a background thread, at most `depth` pages ahead. The thread runs in a copy of the caller's context,
+    so `ratelimit.priority()` set by the caller still applies. Closing the iterator stops the fetcher after its in-flight page."""
+    buffer: queue.Queue = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item: Any) -> None:
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def run() -> None:
+        try:
+            for page in produce():
+                if stopped.is_set():
+                    return
+                put(page)
+        except BaseException as e:
+            put(e)
+        finally:
+            put(done)
+
+    context: contextvars.Context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), name=name, daemon=True).start()
+    try:
+        while (item := buffer.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+async def _afetch_page(reddit: asyncpraw.Reddit, subreddit_name: str, params: dict[str, Any]) -> tuple[list[Post], Optional[str]]:
+    """Async `_fetch_page`."""
+    for attempt in range(RETRIES_PER_PAGE):
+        try:
+            with span("reddit_listing_page"):
+                return await afetch_listing(reddit, subreddit_name, **params)
+        except RETRYABLE as e:
+            if attempt + 1 == RETRIES_PER_PAGE:
+                raise
+            logger.warning(f"🟡 Listing page for r/{subreddit_name} failed on attempt {attempt + 1}/{RETRIES_PER_PAGE}: {e}")
+            RETRIES.inc(operation="backfill_page")
+            await asyncio.sleep(backoff_delay(attempt, retry_after_seconds(e)))
+    raise AssertionError("unreachable")
+
+async def aiter_posts(subreddit_name: str, limit: Optional[int] = None, after: Optional[str] = None, reddit: Optional[asyncpraw.Reddit] = None,
+                      prefetch: int = BACKFILL_PREFETCH, expound: bool = False, archive: bool = True) -> AsyncIterator[Post]:
+    """Async `iter_posts`; the fetcher is a task on the same loop, running up to `prefetch` (at least one) pages ahead."""
+    reddit = reddit or await get_async_client()
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=max(prefetch, 1))
+    done = object()
+
+    async def produce() -> None:
+        cursor, fetched = after, 0
+        try:
+            while (params := _page_params(limit, fetched, cursor)) is not None:
+                posts, cursor = await _afetch_page(reddit, subreddit_name, params) # type: ignore[arg-type]
+                if posts:
+                    await buffer.put(posts)
+                fetched += len(posts)
+                if not posts or cursor is None:
+                    break
+        except Exception as e:
+            await buffer.put(e)
+        await buffer.put(done)
+
+    fetcher: asyncio.Task = asyncio.create_task(produce())
+    try:
+        while (item := await buffer.get()) is not done:
+            if isinstance(item, Exception):
+                raise item
+            posts: list[Post] = item
+            apply_expansions(posts, await aexpound_titles(titles(posts)) if expound else None)
+            if archive:
+                await asyncio.to_thread(archive_posts, posts)
+            for post in posts:
+                yield post
+    finally:
+        fetcher.cancel()
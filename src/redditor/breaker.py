@@ -0,0 +1,255 @@
+"""Circuit breaker with optional hedging, for the Cohere expansion stage"""
+
+# Circuit breaker: https://martinfowler.com/bliki/CircuitBreaker.html
+# Hedged requests ("The Tail at Scale"): https://research.google/pubs/the-tail-at-scale/
+#
+# Without a breaker, every expansion during a Cohere outage waits out the full client timeout, and a 5-post page pays it
+# five times over. The breaker watches the last `window` calls; once failures and slow calls reach `error_ratio` of them,
+# it opens and calls are refused at once (callers fall back to cached text or none) for `open_seconds`. Then a single probe
+# goes through (half-open): success closes the breaker, failure re-opens it. With hedging on, a call that hasn't answered
+# within the recent p95 latency gets a second identical call alongside it, and whichever succeeds first wins.
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from redditor.metrics import BREAKER_EVENTS, BREAKER_STATE
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# -- States, as exported by the BREAKER_STATE gauge
+CLOSED: str = "closed"
+HALF_OPEN: str = "half_open"
+OPEN: str = "open"
+STATE_VALUES: dict[str, int] = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_ENABLED: bool = os.getenv("BREAKER_ENABLED", "true").lower() not in ("0", "false", "no")
+BREAKER_WINDOW: int = int(os.getenv("BREAKER_WINDOW", "20")) # Recent calls the error ratio is taken over
+BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "5")) # Calls in the window before it may trip
+BREAKER_ERROR_RATIO: float = float(os.getenv("BREAKER_ERROR_RATIO", "0.5")) # Failed or slow fraction that trips it
+BREAKER_SLOW_SECONDS: float = float(os.getenv("BREAKER_SLOW_SECONDS", "5")) # Calls at least this slow count as failures
+BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30")) # How long it stays open before probing
+HEDGE_ENABLED: bool = (os.getenv("HEDGE_ENABLED") or "false").lower() not in ("0", "false", "no")
+HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", "0.25")) # Never hedge sooner than this, whatever the p95
+HEDGE_MIN_SAMPLES: int = 20 # Successful calls needed before the p95 is trusted
+LATENCY_SAMPLES: int = 200
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None # Runs both legs of a hedged sync call; created on first use
+_hedge_pool_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of making a call while the breaker is open."""
+
+
+class CircuitBreaker:
+    """Thread-safe breaker over one upstream. `call`/`acall` run a zero-argument function through it (hedged if `hedge`);
+    they raise `CircuitOpenError` without calling while open, and re-raise whatever the function raised."""
+
+    def __init__(self, name: str, enabled: bool = BREAKER_ENABLED, window: int = BREAKER_WINDOW, min_calls: int = BREAKER_MIN_CALLS,
+                 error_ratio: float = BREAKER_ERROR_RATIO, slow_seconds: float = BREAKER_SLOW_SECONDS, open_seconds: float = BREAKER_OPEN_SECONDS,
+                 hedge: bool = HEDGE_ENABLED, hedge_min_delay: float = HEDGE_MIN_DELAY) -> None:
+        self.name = name
+        self.enabled = enabled
+        self.min_calls = min_calls
+        self.error_ratio = error_ratio
+        self.slow_seconds = slow_seconds
+        self.open_seconds = open_seconds
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.stats: dict[str, int] = {"calls": 0, "failures": 0, "slow": 0, "short_circuited": 0, "opened": 0, "hedged": 0, "hedge_wins": 0}
+
+        self._lock = threading.Lock()
+        self._state: str = CLOSED
+        self._opened_at: float = 0.0
+        self._probing: bool = False
+        self._outcomes: deque[bool] = deque(maxlen=window) # True = failed or slow
+        self._latencies: deque[float] = deque(maxlen=LATENCY_SAMPLES) # Successful calls only
+        BREAKER_STATE.set(STATE_VALUES[CLOSED], breaker=name)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    def p95(self) -> Optional[float]:
+        """95th-percentile latency of recent successful calls, or `None` before `HEDGE_MIN_SAMPLES` of them."""
+        with self._lock:
+            if len(self._latencies) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered: list[float] = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))]
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before sending a hedge, or `None` not to hedge (off, too few samples, or not closed)."""
+        if not self.hedge or self._state != CLOSED:
+            return None
+        p95: Optional[float] = self.p95()
+        return max(p95, self.hedge_min_delay) if p95 is not None else None
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. While open this refuses (counting a short circuit) until `open_seconds` have
+        passed, then admits exactly one probe; the caller must report its outcome through `record`."""
+        if not self.enabled:
+            return True
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats["short_circuited"] += 1
+            BREAKER_EVENTS.inc(breaker=self.name, event="short_circuited")
+            return False
+
+    def record(self, elapsed: float, ok: bool) -> None:
+        """Report one call's outcome. Slow successes count against the breaker but still feed the latency samples."""
+        slow: bool = elapsed >= self.slow_seconds
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["failures"] += not ok
+            self.stats["slow"] += ok and slow
+            if ok:
+                self._latencies.append(elapsed)
+            if not self.enabled:
+                return
+
+            failed: bool = not ok or slow
+            if self._state == HALF_OPEN:
+                self._probing = False
+                self._transition(OPEN if failed else CLOSED)
+                return
+            if self._state == OPEN:
+                return # A call admitted before the breaker opened
+            self._outcomes.append(failed)
+            if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.error_ratio:
+                self._transition(OPEN)
+
+    def abandon(self) -> None:
+        """Forget an admitted call without an outcome, so a cancelled probe doesn't leave the breaker half-open for good."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probing = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._transition(CLOSED)
+            self._probing = False
+            self._latencies.clear()
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    def _transition(self, state: str) -> None:
+        """Caller holds the lock."""
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.stats["opened"] += 1
+            BREAKER_EVENTS.inc(breaker=self.name, event="opened")
+            logger.warning(f"🔴 {self.name} circuit open; calls are skipped for {self.open_seconds:g}s")
+        elif state == CLOSED and self._state != CLOSED:
+            logger.info(f"🟢 {self.name} circuit closed")
+        self._outcomes.clear()
+        self._state = state
+        BREAKER_STATE.set(STATE_VALUES[state], breaker=self.name)
+
+    # -- Sync
+    def call(self, fn: Callable[[], T]) -> T:
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        start: float = time.perf_counter()
+        ok: bool = False
+        try:
+            delay: Optional[float] = self.hedge_delay()
+            result: T = fn() if delay is None else self._hedged(fn, delay)
+            ok = True
+            return result
+        finally:
+            self.record(time.perf_counter() - start, ok)
+
+    def _hedged(self, fn: Callable[[], T], delay: float) -> T:
+        """Both legs run on the hedge pool, each in a copy of the caller's context (so spans still land on the request).
+        The losing leg can't be interrupted; it finishes in the background and its result is dropped."""
+        pool: ThreadPoolExecutor = _get_hedge_pool()
+        first: Future = pool.submit(contextvars.copy_context().run, fn)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        self._count_hedge()
+        second: Future = pool.submit(contextvars.copy_context().run, fn)
+        pending: set[Future] = {first, second}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for leg in done:
+                if leg.exception() is None:
+                    if leg is second:
+                        self._count_hedge_win()
+                    return leg.result()
+        return first.result() # Both failed; raise the original's error
+
+    # -- Async
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Async `call`; the losing leg of a hedge is cancelled."""
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        start: float = time.perf_counter()
+        try:
+            delay: Optional[float] = self.hedge_delay()
+            result: T = await fn() if delay is None else await self._ahedged(fn, delay)
+        except asyncio.CancelledError:
+            self.abandon() # The caller went away; that says nothing about the upstream
+            raise
+        except BaseException:
+            self.record(time.perf_counter() - start, ok=False)
+            raise
+        self.record(time.perf_counter() - start, ok=True)
+        return result
+
+    async def _ahedged(self, fn: Callable[[], Awaitable[T]], delay: float) -> T:
+        first: asyncio.Future = asyncio.ensure_future(fn())
+        legs: list[asyncio.Future] = [first]
+        try:
+            done, _ = await asyncio.wait(legs, timeout=delay)
+            if done:
+                return first.result()
+            self._count_hedge()
+            legs.append(asyncio.ensure_future(fn()))
+            pending: set[asyncio.Future] = set(legs)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for leg in done:
+                    if leg.exception() is None:
+                        if leg is not first:
+                            self._count_hedge_win()
+                        return leg.result()
+            return first.result()
+        finally:
+            for leg in legs:
+                leg.cancel()
+
+    def _count_hedge(self) -> None:
+        with self._lock:
+            self.stats["hedged"] += 1
+        BREAKER_EVENTS.inc(breaker=self.name, event="hedged")
+
+    def _count_hedge_win(self) -> None:
+        with self._lock:
+            self.stats["hedge_wins"] += 1
+        BREAKER_EVENTS.inc(breaker=self.name, event="hedge_wins")
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return _hedge_pool
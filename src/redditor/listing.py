@@ -0,0 +1,162 @@
+"""Lean listing fetches: posts read straight from Reddit's listing JSON, and a cache of which subreddit names exist"""
+
+# Reddit listings: https://www.reddit.com/dev/api/#GET_new
+# `subreddit.new()` runs every child through PRAW's objector: a `Submission` per post, each with its own `Redditor` and
+# `Subreddit`, only for `Post` to read five fields off it. `reddit.request()` returns the parsed JSON instead, and `Post`s
+# are built from the child dicts. Validating a name with `subreddit._fetch()` costs a whole `/about` request before the
+# listing; but the listing request validates the name anyway (Reddit redirects unknown names, which prawcore raises as
+# `Redirect`; private and banned ones answer 403/404). So the only validation left is remembering each outcome: names
+# known not to exist are refused without a request until their entry expires.
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import praw
+import asyncpraw
+import prawcore
+import asyncprawcore
+
+from redditor.models import Post
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+SUBREDDIT_GOOD_TTL: float = float(os.getenv("SUBREDDIT_GOOD_TTL", str(24 * 60 * 60))) # seconds a name is trusted to exist
+SUBREDDIT_BAD_TTL: float = float(os.getenv("SUBREDDIT_BAD_TTL", str(60 * 60))) # seconds a missing/private name is refused without asking Reddit
+SUBREDDIT_CACHE_ENTRIES: int = int(os.getenv("SUBREDDIT_CACHE_ENTRIES", "4096"))
+LISTING_PAGE_SIZE: int = 100 # Reddit's maximum per listing request
+
+# -- What a listing request raises for a name that doesn't exist (or can't be read)
+MISSING: tuple[type[Exception], ...] = (
+    prawcore.Redirect, prawcore.NotFound, prawcore.Forbidden,
+    asyncprawcore.Redirect, asyncprawcore.NotFound, asyncprawcore.Forbidden,
+)
+
+
+class SubredditNotFound(Exception):
+    """Raised, without a request, for a name an earlier request found missing, private or banned."""
+
+
+class SubredditRegistry:
+    """Subreddit names known to exist or not, each remembered until it expires (good and bad names have separate TTLs).
+    Least-recently-used names are dropped past `max_entries`. Thread-safe; shared by the sync and async fetchers."""
+
+    def __init__(self, good_ttl: float = SUBREDDIT_GOOD_TTL, bad_ttl: float = SUBREDDIT_BAD_TTL, max_entries: int = SUBREDDIT_CACHE_ENTRIES) -> None:
+        self.good_ttl = good_ttl
+        self.bad_ttl = bad_ttl
+        self.max_entries = max_entries
+        self.stats: dict[str, int] = {"known_good": 0, "known_bad": 0, "unknown": 0}
+
+        self._names: OrderedDict[str, tuple[bool, float]] = OrderedDict() # lowercased name -> (exists, expires_at)
+        self._lock = threading.Lock()
+
+    def known(self, name: str) -> Optional[bool]:
+        """Whether `name` exists, if that's known and hasn't expired; otherwise `None`."""
+        key: str = name.lower()
+        with self._lock:
+            entry: Optional[tuple[bool, float]] = self._names.get(key)
+            if entry is None or time.monotonic() >= entry[1]:
+                self._names.pop(key, None)
+                self.stats["unknown"] += 1
+                return None
+            self._names.move_to_end(key)
+            self.stats["known_good" if entry[0] else "known_bad"] += 1
+            return entry[0]
+
+    def mark(self, name: str, exists: bool) -> None:
+        key: str = name.lower()
+        with self._lock:
+            self._names[key] = (exists, time.monotonic() + (self.good_ttl if exists else self.bad_ttl))
+            self._names.move_to_end(key)
+            while len(self._names) > self.max_entries:
+                self._names.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._names.clear()
+
+
+subreddits = SubredditRegistry()
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+def listing_params(limit: int, after: Optional[str] = None, before: Optional[str] = None) -> dict[str, Any]:
+    params: dict[str, Any] = {"limit": limit}
+    if after:
+        params["after"] = after
+    if before:
+        params["before"] = before
+    return params
+
+def parse_listing(payload: dict[str, Any], subreddit: str = "") -> tuple[list[Post], Optional[str]]:
+    """`Post`s from a listing's JSON, and the `after` cursor for the next page."""
+    data: dict[str, Any] = payload["data"]
+    posts: list[Post] = []
+    for child in data["children"]:
+        fields: dict[str, Any] = child["data"]
+        author: Optional[str] = fields.get("author")
+        posts.append(Post(
+            id=fields["id"],
+            created_utc=fields["created_utc"],
+            score=fields["score"],
+            author="None" if author in (None, "[deleted]") else author, # What `str(submission.author)` gives for deleted accounts
+            title=fields["title"],
+            subreddit=subreddit,
+        ))
+    return posts, data.get("after")
+
+def _refuse_if_missing(subreddit_name: str) -> None:
+    if subreddits.known(subreddit_name) is False:
+        raise SubredditNotFound(f"r/{subreddit_name} does not exist or is private (cached)")
+
+def _last_page(page: list[Post], asked: int, after: Optional[str], before: Optional[str]) -> bool:
+    """Whether to stop paging: a `before` fetch is one page, and a page shorter than asked for means Reddit has no more to give."""
+    return before is not None or after is None or len(page) < asked
+
+def fetch_listing(reddit: praw.Reddit, subreddit_name: str, limit: int, after: Optional[str] = None, validate: bool = True,
+                  before: Optional[str] = None) -> tuple[list[Post], Optional[str]]:
+    """Up to `limit` of `subreddit_name`'s newest posts, starting after the `after` fullname, and the cursor past the last one.
+    One request per `LISTING_PAGE_SIZE` posts, following the cursor like `subreddit.new(limit=...)` does, and none past a
+    page shorter than asked for. With `before`, a single page of posts newer than that fullname instead. With `validate`, raises `SubredditNotFound` for a name known to
+    be missing. Otherwise raises what prawcore raises (e.g. `Redirect`), recording the outcome."""
+    if validate:
+        _refuse_if_missing(subreddit_name)
+    posts: list[Post] = []
+    while len(posts) < limit:
+        asked: int = min(limit - len(posts), LISTING_PAGE_SIZE)
+        params: dict[str, Any] = listing_params(asked, after, before)
+        try:
+            payload: dict[str, Any] = reddit.request(method="GET", path=f"r/{subreddit_name}/new", params=params)
+        except MISSING:
+            subreddits.mark(subreddit_name, exists=False)
+            raise
+        subreddits.mark(subreddit_name, exists=True)
+        page, after = parse_listing(payload, subreddit_name)
+        posts.extend(page)
+        if _last_page(page, asked, after, before):
+            break
+    return posts, after
+
+async def afetch_listing(reddit: asyncpraw.Reddit, subreddit_name: str, limit: int, after: Optional[str] = None, validate: bool = True,
+                         before: Optional[str] = None) -> tuple[list[Post], Optional[str]]:
+    """Async `fetch_listing`."""
+    if validate:
+        _refuse_if_missing(subreddit_name)
+    posts: list[Post] = []
+    while len(posts) < limit:
+        asked: int = min(limit - len(posts), LISTING_PAGE_SIZE)
+        params: dict[str, Any] = listing_params(asked, after, before)
+        try:
+            payload: dict[str, Any] = await reddit.request(method="GET", path=f"r/{subreddit_name}/new", params=params)
+        except MISSING:
+            subreddits.mark(subreddit_name, exists=False)
+            raise
+        subreddits.mark(subreddit_name, exists=True)
+        page, after = parse_listing(payload, subreddit_name)
+        posts.extend(page)
+        if _last_page(page, asked, after, before):
+            break
+    return posts, after
@@ -0,0 +1,153 @@
+"""Non-blocking logging: callers enqueue records, one background thread formats and writes them"""
+
+# QueueHandler/QueueListener: https://docs.python.org/3/howto/logging-cookbook.html#dealing-with-handlers-that-block
+# Log calls on request threads and the event loop only put a record on a bounded queue. When the queue is full the record
+# is dropped and counted rather than waiting on disk, so logging can't become the bottleneck under load.
+
+import os
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from pathlib import Path
+from typing import Any, Optional
+
+from redditor.metrics import Counter
+
+LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE: Path = Path(os.getenv("LOG_FILE") or Path(__file__).parent.parent.parent / "logs" / "redditor.log")
+LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text").lower() # "text" or "json" (one object per line)
+LOG_MAX_BYTES: int = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))) # Rotate once the file reaches this size...
+LOG_ROTATE_SECONDS: float = float(os.getenv("LOG_ROTATE_SECONDS", str(24 * 60 * 60))) # ...or this old, whichever comes first
+LOG_BACKUP_COUNT: int = int(os.getenv("LOG_BACKUP_COUNT", "14"))
+LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", "10000")) # Records waiting for the writer before new ones are dropped
+WEB_CONCURRENCY: int = int(os.getenv("WEB_CONCURRENCY", "1")) # uvicorn worker processes; see `worker_log_file`
+
+TEXT_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+DATE_FORMAT: str = "%Y-%m-%d %H:%M:%S"
+
+LOG_RECORDS_DROPPED = Counter("redditor_log_records_dropped_total", "Log records dropped because the logging queue was full.", ("level",))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, thread, and the traceback if any."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SizeAndTimeRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """`RotatingFileHandler` that also rolls over every `interval` seconds. Backups are numbered (`.1` newest)."""
+
+    def __init__(self, filename: Path, max_bytes: int = LOG_MAX_BYTES, interval: float = LOG_ROTATE_SECONDS, backup_count: int = LOG_BACKUP_COUNT) -> None:
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.interval = interval
+        started: float = filename.stat().st_mtime if filename.is_file() else time.time()
+        self.rollover_at: float = started + interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.interval and time.time() >= self.rollover_at:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self) -> None:
+        super().doRollover()
+        self.rollover_at = time.time() + self.interval
+
+
+class BoundedQueueHandler(logging.handlers.QueueHandler):
+    """`QueueHandler` that never blocks: when the queue is full the record is dropped and counted."""
+
+    def __init__(self, record_queue: queue.Queue) -> None:
+        super().__init__(record_queue)
+        self.dropped: int = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc(level=record.levelname)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Merge args and render the traceback now (they may not survive to the writer thread), but leave formatting to the writer."""
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """`QueueListener` whose `stop()` waits for room in a full queue rather than raising `queue.Full`."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+_listener: Optional[DrainingQueueListener] = None
+_handler: Optional[BoundedQueueHandler] = None
+_lock = threading.Lock()
+
+def worker_log_file(log_file: Path, workers: int = WEB_CONCURRENCY) -> Path:
+    """`log_file` with this process's pid before the suffix (`redditor.1234.log`) when several workers run, else unchanged.
+    Rotation renames the file, and processes rotating one file independently overwrite each other's backups."""
+    return log_file.with_name(f"{log_file.stem}.{os.getpid()}{log_file.suffix}") if workers > 1 else log_file
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Optional[Path] = LOG_FILE, fmt: str = LOG_FORMAT, queue_size: int = LOG_QUEUE_SIZE) -> BoundedQueueHandler:
+    """Route the root logger (and so `praw`/`prawcore`) through a bounded queue to a background writer for stderr and `log_file`.
+    Idempotent: later calls return the handler installed by the first. `log_file=None` logs to stderr only.
+    With `WEB_CONCURRENCY` above 1, each process writes its own file (see `worker_log_file`)."""
+    global _listener, _handler
+    with _lock:
+        if _handler is not None:
+            return _handler
+
+        formatter: logging.Formatter = JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT, DATE_FORMAT)
+        handlers: list[logging.Handler] = [logging.StreamHandler()]
+        if log_file is not None:
+            log_file = worker_log_file(log_file)
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+            handlers.append(SizeAndTimeRotatingFileHandler(log_file))
+        for handler in handlers:
+            handler.setFormatter(formatter)
+
+        _handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+        root: logging.Logger = logging.getLogger()
+        root.setLevel(level)
+        root.addHandler(_handler)
+        for logger_name in ("praw", "prawcore"):
+            logging.getLogger(logger_name).setLevel(level)
+
+        _listener = DrainingQueueListener(_handler.queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+        return _handler
+
+def stop_logging() -> None:
+    """Write out everything still queued and stop the writer thread."""
+    global _listener, _handler
+    with _lock:
+        if _listener is not None:
+            logging.getLogger().removeHandler(_handler) # type: ignore[arg-type]
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _listener, _handler = None, None
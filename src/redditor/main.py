@@ -6,41 +6,37 @@
 # -- Imports, with help links
 import os # https://www.digitalocean.com/community/tutorials/python-os-module#python-os-module
 import time # https://www.programiz.com/python-programming/time
+import queue # https://docs.python.org/3/library/queue.html
+import threading # https://docs.python.org/3/library/threading.html
+from contextlib import contextmanager # https://docs.python.org/3/library/contextlib.html#contextlib.contextmanager
+from concurrent.futures import ThreadPoolExecutor # https://docs.python.org/3/library/concurrent.futures.html
 import dotenv # https://www.geeksforgeeks.org/using-python-environment-variables-with-python-dotenv/
 import logging # https://docs.python.org/3/howto/logging.html#basic-logging-tutorial 
-from typing import Any, Optional # https://www.digitalocean.com/community/tutorials/python-typing-module
+from typing import Any, Iterator, Optional # https://www.digitalocean.com/community/tutorials/python-typing-module
 from pathlib import Path # https://realpython.com/python-pathlib/#path-instantiation-with-pythons-pathlib
 from pprint import pprint # https://realpython.com/python-pretty-print/#working-with-pprint
-from datetime import datetime # https://www.programiz.com/python-programming/datetime
 
 # -- PRAW: https://github.com/praw-dev/praw?tab=readme-ov-file#quickstart | https://praw.readthedocs.io/en/stable/
 from praw import Reddit
 from praw.models.reddit.redditor import Redditor
-from praw.models.reddit.subreddit import Subreddit
 from prawcore.exceptions import (
     OAuthException, Redirect, RequestException,
     ResponseException, ServerError, Forbidden,
     NotFound, TooManyRequests
     )
 
-from redditor.ai import expound_title
+from redditor.ai import expound_titles
+from redditor.archive import archive_posts
+from redditor.listing import SubredditNotFound, fetch_listing, subreddits
+from redditor.logs import LOG_FILE, setup_logging
+from redditor.metrics import ERRORS, RETRIES, span, timed
+from redditor.models import Post, apply_expansions, titles
+from redditor.ratelimit import RateLimitedRequestor, backoff_delay, retry_after_seconds
 
 # --------------------------------------------------------------------------------------------------------------------------
-# --- Logging
-LOG_LEVEL = logging.INFO # logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL
-
-LOG_FILE: Path = Path(__file__).parent.parent.parent / "logs" / f"{datetime.now().strftime('%Y-%m-%d')}.log"
-LOG_FILE.parent.mkdir(parents=True, exist_ok=True)  # Ensure the logs directory exists
-logging.basicConfig(filename=LOG_FILE, level=LOG_LEVEL, encoding='utf-8', format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+# --- Logging; records go through a bounded queue to a background writer (see `redditor.logs`)
+setup_logging()
 logger: logging.Logger = logging.getLogger(__name__)
-stream_handler = logging.StreamHandler()
-stream_handler.setLevel(logging.DEBUG)
-stream_handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s", "%Y-%m-%d %H:%M:%S"))
-logger.addHandler(stream_handler)
-for logger_name in ("praw", "prawcore"):
-    praw_logger: logging.Logger = logging.getLogger(logger_name)
-    praw_logger.setLevel(LOG_LEVEL)
-    praw_logger.addHandler(stream_handler)
 
 # --------------------------------------------------------------------------------------------------------------------------
 
@@ -53,16 +49,20 @@ REDDIT_CLIENT_SECRET: str = os.getenv("REDDIT_CLIENT_SECRET", "")
 REDDIT_USER_AGENT: str = os.getenv("REDDIT_USER_AGENT", "")
 REDDIT_USERNAME: str = os.getenv("REDDIT_USERNAME", "")
 REDDIT_PASSWORD: str = os.getenv("REDDIT_PASSWORD", "")
+REDDIT_OAUTH_URL: str = os.getenv("REDDIT_OAUTH_URL", "https://oauth.reddit.com") # Override to point PRAW at a stand-in server (see benchmarks/replay.py)
+REDDIT_URL: str = os.getenv("REDDIT_URL", "https://www.reddit.com") # Token endpoint host
+REDDIT_VERIFY_LOGIN: bool = os.getenv("REDDIT_VERIFY_LOGIN", "true").lower() not in ("0", "false", "no") # Probe `user.me()` on first use
+BATCH_MAX_WORKERS: int = int(os.getenv("BATCH_MAX_WORKERS", "4")) # Subreddits fetched at once by `fetch_many_posts`
 
 # --------------------------------------------------------------------------------------------------------------------------
 
 # Reddit Client, via PRAW 
-def create_client() -> Reddit:
-    """Create a Reddit client using the `praw` library."""
+@timed("create_client")
+def create_client(verify: bool = True) -> Reddit:
+    """Create a Reddit client using the `praw` library. With `verify=False`, skip the `user.me()` probe; PRAW then authenticates on the first real request."""
     attempts = 0
 
     retries = 3 # Set the number of retries
-    delay = 2  # seconds
 
     while attempts < retries:
         try:
@@ -71,9 +71,16 @@ def create_client() -> Reddit:
                 client_secret=REDDIT_CLIENT_SECRET,
                 user_agent=REDDIT_USER_AGENT,
                 username=REDDIT_USERNAME,
-                password=REDDIT_PASSWORD
+                password=REDDIT_PASSWORD,
+                oauth_url=REDDIT_OAUTH_URL,
+                reddit_url=REDDIT_URL,
+                requestor_class=RateLimitedRequestor,  # Paces every request through the shared scheduler
             )
 
+            if not verify:
+                logger.info("⚪ Reddit client created; authentication deferred to first request.")
+                return reddit
+
             logger.info("⚪ Authenticating Reddit client...")
             user: Optional[Redditor] = reddit.user.me()  # Raises on failure
             logger.info(f"🟢 Reddit client authenticated as: {user.name}")  # type: ignore
@@ -86,7 +93,8 @@ def create_client() -> Reddit:
 
         except (RequestException, ResponseException, ServerError, TooManyRequests) as e:
             logger.warning(f"🟡 Network/API error on attempt {attempts+1}/{retries}: {str(e)}")
-            time.sleep(delay * (attempts + 1))
+            RETRIES.inc(operation="create_client")
+            time.sleep(backoff_delay(attempts, retry_after_seconds(e)))
             attempts += 1
 
         except Forbidden as e: # type: ignore
@@ -98,40 +106,129 @@ def create_client() -> Reddit:
             break
 
     logger.error("🔴 Failed to authenticate Reddit client after %d attempts.", retries)
+    ERRORS.inc(operation="create_client", error="AuthenticationFailed")
     raise RuntimeError("Reddit client authentication failed.")
 
+class ClientManager:
+    """Process-wide Reddit client, created and authenticated on first use rather than at import.
+    PRAW keeps one `requests.Session` (and its connection pool) per client, so sharing the client shares the pool.
+    Shortly before the OAuth token expires, a daemon thread swaps in a newly authorized client, so requests never pay for
+    the refresh and no thread's client is touched while it's in use. Callers holding the old one keep using it; PRAW
+    refreshes its token itself if it outlives it."""
+
+    REFRESH_MARGIN: float = 60 # seconds before expiry to refresh the token
+
+    def __init__(self, verify: bool = REDDIT_VERIFY_LOGIN, refresh_in_background: bool = True) -> None:
+        self.verify = verify
+        self.refresh_in_background = refresh_in_background
+        self._client: Optional[Reddit] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+
+    def get(self) -> Reddit:
+        """Return the shared client, creating it on the first call. Raises `RuntimeError` if authentication fails."""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = create_client(verify=self.verify)
+                    if self.refresh_in_background:
+                        self._start_refresher()
+        return self._client
+
+    def reset(self) -> None:
+        """Drop the shared client (e.g. after credentials change); the next `get()` creates a new one."""
+        with self._lock:
+            self._stop.set()
+            if self._refresher is not None:
+                self._refresher.join(timeout=1)
+            self._client, self._refresher = None, None
+            self._stop = threading.Event()
+
+    def _start_refresher(self) -> None:
+        self._refresher = threading.Thread(target=self._refresh_loop, args=(self._stop,), name="reddit-token-refresh", daemon=True)
+        self._refresher.start()
+
+    def _refresh_loop(self, stop: threading.Event) -> None:
+        while not stop.is_set():
+            authorizer = self._client._core._authorizer if self._client else None # prawcore internals; no public API for this
+            expires_at: Optional[float] = getattr(authorizer, "_expiration_timestamp", None)
+            wait: float = max(expires_at - time.time() - self.REFRESH_MARGIN, 1) if expires_at else self.REFRESH_MARGIN
+            if stop.wait(wait):
+                return
+            if authorizer is None or not expires_at:
+                continue # Not authenticated yet (deferred verification); check again later
+            try:
+                # The live client isn't thread-safe, so authorize a new one nobody else can see yet and swap it in
+                fresh: Reddit = create_client(verify=False)
+                fresh._core._authorizer.refresh()
+            except Exception as e:
+                logger.warning(f"🟡 Background token refresh failed; PRAW will refresh on the next request: {e}")
+                continue
+            with self._lock:
+                if stop.is_set():
+                    return # Reset while refreshing; don't bring the old client back
+                self._client = fresh
+            logger.debug("🔄 Swapped in a Reddit client with a fresh OAuth token in the background.")
+
+client_manager = ClientManager()
+
+def get_client() -> Reddit:
+    """Shared, lazily-created Reddit client; see `ClientManager`."""
+    return client_manager.get()
+
+# PRAW clients aren't thread-safe (https://praw.readthedocs.io/en/stable/getting_started/multiple_instances.html), so
+# threads fetching in parallel each borrow their own. Returned clients are kept for the next borrower, so their tokens and
+# connection pools are reused across batches; at most `BATCH_MAX_WORKERS` (or the largest `max_workers` used) ever exist.
+_spare_clients: "queue.SimpleQueue[Reddit]" = queue.SimpleQueue()
+
+@contextmanager
+def borrowed_client() -> Iterator[Reddit]:
+    """A Reddit client no other thread is using until the block exits."""
+    try:
+        reddit: Reddit = _spare_clients.get_nowait()
+    except queue.Empty:
+        reddit = create_client(verify=False)
+    try:
+        yield reddit
+    finally:
+        _spare_clients.put(reddit)
+
 # PRAW API Rate Limits: https://praw.readthedocs.io/en/stable/getting_started/rate_limits.html
-def fetch_latest_posts(reddit: Reddit = create_client(), subreddit_name: str = "politics", limit: int = 5) -> list[dict[str, str]]:
-    """Fetch the latest `limit` posts from the specified subreddit. Returns a list of dictionaries containing post details."""
+@timed("fetch_latest_posts")
+def fetch_latest_posts(reddit: Optional[Reddit] = None, subreddit_name: str = "politics", limit: int = 5, validate: bool = True) -> list[dict[str, Any]]:
+    """Fetch the latest `limit` posts from the specified subreddit, using the shared client unless `reddit` is given. Returns a list of dictionaries containing post details.
+    One request per 100 posts: the listing itself detects an invalid name (see `redditor.listing`), and with `validate` a name already known to be invalid costs none.
+    Pass `validate=False` when the name is already known to exist (e.g. from `validate_subreddits`) to skip that check."""
+    reddit = reddit or get_client()
     attempts = 0
     retries = 3
-    delay = 2  # seconds
 
     while attempts < retries:
         try:
-            subreddit: Subreddit = reddit.subreddit(subreddit_name)
-            subreddit._fetch()  # Detect redirect (invalid subreddit name), Raises prawcore.exceptions.Redirect if invalid
-
             logger.info(f"⚪ Fetching latest posts from r/{subreddit_name}...")
-            posts: list[dict[str, str]] = []
-            for submission in subreddit.new(limit=limit):
-                posts.append({
-                    "title": submission.title,
-                    "author": str(submission.author),
-                    "upvotes": submission.score,
-                    "expounded": expound_title(submission.title) if submission.title else "No title provided",
-                })
+            with span("reddit_listing"):
+                posts: list[Post] = fetch_listing(reddit, subreddit_name, limit, validate=validate)[0]
 
+            # Expand titles concurrently once the listing is in; order follows the listing
+            apply_expansions(posts, expound_titles(titles(posts)))
+
+            archive_posts(posts)
             logger.info(f"🟢 Fetched {len(posts)} latest posts from r/{subreddit_name}")
-            return posts
+            return [post.as_dict() for post in posts]
 
         except Redirect:
             logger.error(f"🔴 Subreddit r/{subreddit_name} does not exist (redirected).")
             break
 
+        except SubredditNotFound as e:
+            logger.error(f"🔴 {e}")
+            break
+
         except (RequestException, ResponseException, ServerError, TooManyRequests) as e:
             logger.warning(f"🟡 Network/API error on attempt {attempts + 1}/{retries}: {e}")
-            time.sleep(delay * (attempts + 1))
+            RETRIES.inc(operation="fetch_latest_posts")
+            time.sleep(backoff_delay(attempts, retry_after_seconds(e)))
             attempts += 1
 
         except (Forbidden, NotFound) as e: # type: ignore
@@ -143,11 +240,61 @@ def fetch_latest_posts(reddit: Reddit = create_client(), subreddit_name: str = "
             break
 
     logger.error(f"🔴 Failed to fetch posts from r/{subreddit_name} after {retries} retries.")
+    ERRORS.inc(operation="fetch_latest_posts", error="FetchFailed")
     return []
 
+def validate_subreddits(subreddit_names: list[str], reddit: Optional[Reddit] = None) -> dict[str, str]:
+    """Check many subreddit names at once via `/api/info` (up to 100 names per request). Returns {lowercased name: canonical display name} for those that exist.
+    The outcome for every name is remembered in `redditor.listing.subreddits`."""
+    reddit = reddit or get_client()
+    existing: dict[str, str] = {subreddit.display_name.lower(): subreddit.display_name for subreddit in reddit.info(subreddits=subreddit_names)}
+    for name in subreddit_names:
+        subreddits.mark(name, exists=name.lower() in existing)
+    return existing
+
+def fetch_many_posts(subreddit_names: list[str], reddit: Optional[Reddit] = None, limit: int = 5, max_workers: int = BATCH_MAX_WORKERS) -> dict[str, dict[str, Any]]:
+    """Fetch the latest `limit` posts from each subreddit, validating all names in one go and fetching listings concurrently.
+    Names are validated with `reddit` (default: the shared client); each fetch thread uses a client of its own (see `borrowed_client`).
+    Requests still go through the shared rate-limit scheduler. Returns {name: {"posts": [...], "error": Optional[str]}}, in input order; one failure doesn't affect the rest."""
+    reddit = reddit or get_client()
+    names: list[str] = list(dict.fromkeys(name.strip() for name in subreddit_names if name.strip())) # De-duplicate, keep order
+    results: dict[str, dict[str, Any]] = {name: {"posts": [], "error": None} for name in names}
+
+    try:
+        existing: dict[str, str] = validate_subreddits(names, reddit)
+    except Exception as e:
+        logger.error(f"🔴 Failed to validate subreddits {names}: {e}", exc_info=True)
+        for result in results.values():
+            result["error"] = f"Validation failed: {e}"
+        return results
+
+    valid: list[str] = [name for name in names if name.lower() in existing]
+    for name in names:
+        if name.lower() not in existing:
+            logger.error(f"🔴 Subreddit r/{name} does not exist.")
+            results[name]["error"] = "Subreddit does not exist"
+
+    logger.info(f"⚪ Fetching latest posts from {len(valid)} subreddits...")
+    if valid:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(valid))), thread_name_prefix="fetch") as pool:
+            for name, posts in zip(valid, pool.map(_fetch_with_own_client, valid, [limit] * len(valid))):
+                results[name]["posts"] = posts
+                if not posts:
+                    results[name]["error"] = "No posts fetched; see logs"
+
+    return results
+
+def _fetch_with_own_client(subreddit_name: str, limit: int) -> list[dict[str, Any]]:
+    try:
+        with borrowed_client() as reddit:
+            return fetch_latest_posts(reddit, subreddit_name, limit, validate=False)
+    except RuntimeError as e: # The client couldn't be created
+        logger.error(f"🔴 No Reddit client for r/{subreddit_name}: {e}")
+        return []
+
 
 if __name__ == "__main__":
-    reddit: Reddit = create_client()
+    reddit: Reddit = get_client()
     
     pprint(LOG_FILE.is_file()) # 🧪 check if LOG_FILE exists
     # pprint(DOTENV_FILE.is_file()) # .is_file() implies .exists() # 🧪 check if DOTENV_FILE exists
@@ -159,7 +306,7 @@ if __name__ == "__main__":
     # pprint(reddit.user.me()) 
 
     subreddit_name: str = input("Enter subreddit name (default: politics): ") or "politics"
-    latest_posts: list[dict[str, str]] = fetch_latest_posts(reddit, subreddit_name)
+    latest_posts: list[dict[str, Any]] = fetch_latest_posts(reddit, subreddit_name)
     # logger.info("Latest posts from r/%s:", subreddit_name)
     pprint(f"Latest {len(latest_posts)} posts from r/{subreddit_name}: ")
     [pprint(i) for i in latest_posts]
@@ -0,0 +1,169 @@
+"""In-process metrics: counters, gauges, latency histograms and timing spans, exported in Prometheus text format"""
+
+# Prometheus exposition format: https://prometheus.io/docs/instrumenting/exposition_formats/#text-based-format
+# Server-Timing header: https://developer.mozilla.org/en-US/docs/Web/HTTP/Headers/Server-Timing
+#
+# Cheap enough to leave on: each observation is a perf_counter() pair plus a short locked update.
+
+import time
+import bisect
+import inspect
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+LabelValues = tuple[str, ...]
+
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Per-request {span name: total seconds}; set by the server middleware, read back into a Server-Timing header
+request_timings: contextvars.ContextVar[Optional[dict[str, float]]] = contextvars.ContextVar("request_timings", default=None)
+
+
+class _Metric:
+    kind: str = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: LabelValues, extra: str = "") -> str:
+        pairs: list[str] = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key: LabelValues = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{self._labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        key: LabelValues = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = buckets
+        self._values: dict[LabelValues, list] = {} # key -> [per-bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key: LabelValues = self._key(labels)
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series: list = self._values.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[index] += 1
+            series[-1] += value
+
+    def _samples(self) -> list[str]:
+        lines: list[str] = []
+        with self._lock:
+            for key, series in self._values.items():
+                cumulative = 0
+                for bound, count in zip((*self.buckets, "+Inf"), series[:-1]):
+                    cumulative += count
+                    le: str = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{self._labels(key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{self._labels(key)} {series[-1]}")
+                lines.append(f"{self.name}_count{self._labels(key)} {cumulative}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render() -> str:
+    """Every registered metric, in Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+# --------------------------------------------------------------------------------------------------------------------------
+# -- The project's metrics
+
+SPAN_SECONDS = Histogram("redditor_span_seconds", "Duration of instrumented operations.", ("span",))
+SPAN_ERRORS = Counter("redditor_span_errors_total", "Instrumented operations that raised.", ("span", "error"))
+RETRIES = Counter("redditor_retries_total", "Retries after a network/API error.", ("operation",))
+ERRORS = Counter("redditor_errors_total", "Operations that gave up, by error kind.", ("operation", "error"))
+HTTP_SECONDS = Histogram("redditor_http_request_seconds", "FastAPI request latency, until response headers are sent.", ("method", "route", "status"))
+RATELIMIT_REMAINING = Gauge("redditor_reddit_ratelimit_remaining", "Requests left in Reddit's current rate-limit window.")
+RATELIMIT_RESET = Gauge("redditor_reddit_ratelimit_reset_seconds", "Seconds until Reddit's rate-limit window resets, as of the last response.")
+CACHE_EVENTS = Gauge("redditor_cache_events", "Cache counters, by cache and event.", ("cache", "event"))
+BREAKER_STATE = Gauge("redditor_breaker_state", "Circuit breaker state: 0 closed, 1 half-open, 2 open.", ("breaker",))
+BREAKER_EVENTS = Counter("redditor_breaker_events_total", "Circuit breaker short circuits, trips and hedged calls.", ("breaker", "event"))
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+def _record(name: str, elapsed: float) -> None:
+    SPAN_SECONDS.observe(elapsed, span=name)
+    timings: Optional[dict[str, float]] = request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + elapsed
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """Time the block into `redditor_span_seconds{span=name}` and the current request's timing breakdown."""
+    start: float = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        SPAN_ERRORS.inc(span=name, error=type(e).__name__)
+        raise
+    finally:
+        _record(name, time.perf_counter() - start)
+
+def timed(name: str) -> Callable:
+    """Decorator form of `span`, for sync and async functions."""
+    def decorator(function: Callable) -> Callable:
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def server_timing(timings: dict[str, float]) -> str:
+    """Format a request's breakdown as a `Server-Timing` header value (milliseconds)."""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items())
@@ -0,0 +1,55 @@
+"""Compact, typed post records and their JSON encoding"""
+
+import json
+from dataclasses import dataclass, fields
+from typing import Any, Iterable, Optional
+
+
+@dataclass(slots=True)
+class Post:
+    """One submission, as fetched. Slotted, so 10k of these cost a fraction of the equivalent dicts."""
+    id: str
+    created_utc: float
+    score: int
+    author: str
+    title: str
+    subreddit: str = ""
+    expounded: Optional[str] = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """The dict shape `fetch_latest_posts` returns and the templates render."""
+        return {"title": self.title, "author": self.author, "upvotes": self.score, "expounded": self.expounded}
+
+    def project(self, names: Iterable[str]) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in names}
+
+
+def titles(posts: Iterable[Post]) -> list[str]:
+    """The titles to send for expansion, in listing order; untitled posts are skipped."""
+    return [post.title for post in posts if post.title]
+
+def apply_expansions(posts: list[Post], expansions: Optional[list[Optional[str]]]) -> None:
+    """Set `expounded` on `posts`: a placeholder for untitled ones, and `expansions` (one per `titles(posts)`, or `None` to skip) for the rest."""
+    for post in posts:
+        if not post.title:
+            post.expounded = "No title provided"
+    if expansions is not None:
+        for post, expounded in zip([post for post in posts if post.title], expansions):
+            post.expounded = expounded
+
+
+POST_FIELDS: tuple[str, ...] = tuple(field.name for field in fields(Post))
+
+def parse_fields(spec: Optional[str]) -> tuple[str, ...]:
+    """Turn a `fields=id,title` query value into field names; all fields when empty. Raises `ValueError` on unknown names."""
+    if not spec:
+        return POST_FIELDS
+    names: tuple[str, ...] = tuple(dict.fromkeys(name.strip() for name in spec.split(",") if name.strip()))
+    unknown: list[str] = [name for name in names if name not in POST_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(POST_FIELDS)}")
+    return names
+
+def encode_posts(posts: Iterable[Post], names: tuple[str, ...] = POST_FIELDS) -> bytes:
+    """Serialise posts straight to JSON bytes, keeping only `names`. Skips FastAPI's per-value `jsonable_encoder` walk, which dominates for large lists."""
+    return json.dumps([post.project(names) for post in posts], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -0,0 +1,239 @@
+"""Process-wide pacing of Reddit requests, driven by Reddit's X-Ratelimit-* response headers"""
+
+# Reddit rate limits: https://support.reddithelp.com/hc/en-us/articles/16160319875092-Reddit-Data-API-Wiki
+# PRAW rate limits: https://praw.readthedocs.io/en/stable/getting_started/rate_limits.html
+#
+# Every Reddit client in this process (sync and async) sends through one `RateLimitScheduler`, via the
+# requestor classes below. Each response's `x-ratelimit-remaining`/`x-ratelimit-reset` re-sizes the budget,
+# so requests are spread across the window instead of bursting into a 429.
+
+import os
+import time
+import random
+import inspect
+import asyncio
+import logging
+import threading
+import contextvars
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Mapping, Optional
+
+import prawcore
+import asyncprawcore
+
+from redditor.metrics import RATELIMIT_REMAINING, RATELIMIT_RESET
+from redditor.shared import SharedState, get_shared_state
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+# -- Priorities; interactive requests (a user waiting on a page) go ahead of background work
+INTERACTIVE: int = 0
+BACKGROUND: int = 1
+
+REDDIT_RATE_LIMIT: float = float(os.getenv("REDDIT_RATE_LIMIT", "100")) # Requests per window assumed before Reddit tells us otherwise
+REDDIT_RATE_WINDOW: float = float(os.getenv("REDDIT_RATE_WINDOW", "60")) # seconds
+REDDIT_RATE_BURST: float = float(os.getenv("REDDIT_RATE_BURST", "10")) # Requests that may go out back-to-back
+BACKGROUND_RESERVE: float = 0.5 # Fraction of the burst kept back for interactive requests
+
+request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=INTERACTIVE)
+
+@contextmanager
+def priority(level: int) -> Iterator[None]:
+    """Send every Reddit request made inside this block (in this thread or task) at `level`."""
+    token: contextvars.Token = request_priority.set(level)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+class RateLimitScheduler:
+    """Token bucket shared by every outbound Reddit request in the process (or, given `shared`, every process on the host).
+    The refill rate is `remaining / seconds until reset` from the latest response headers; once `remaining` hits zero,
+    everything waits for the reset. Background requests only take a token when no interactive request is waiting
+    (in this process) and the bucket holds more than the interactive reserve."""
+
+    _STATE: tuple[str, ...] = ("_tokens", "_rate", "_remaining", "_reset_at", "_blocked_until", "_updated_at") # What `shared` persists
+
+    def __init__(self, rate_limit: float = REDDIT_RATE_LIMIT, window: float = REDDIT_RATE_WINDOW, burst: float = REDDIT_RATE_BURST, shared: Optional[SharedState] = None) -> None:
+        self.burst = burst
+        self.shared = shared
+        self.stats: dict[str, float] = {"acquired": 0, "waited_seconds": 0.0, "throttled": 0}
+
+        self._lock = threading.Lock()
+        self._clock = time.time if shared is not None else time.monotonic # Processes only agree on wall-clock time
+        self._tokens: float = burst
+        self._base_rate: float = rate_limit / window
+        self._rate: float = self._base_rate # tokens per second
+        self._remaining: Optional[float] = None # Requests left in Reddit's window, per the last response
+        self._reset_at: float = 0.0 # time Reddit's window resets
+        self._blocked_until: float = 0.0 # time set by a 429's Retry-After
+        self._updated_at: float = self._clock()
+        self._interactive_waiting: int = 0
+        self._counters_lock = threading.Lock() # Not `_lock`: in shared mode that is held across a SQLite transaction, and the event loop takes this one
+
+    @property
+    def remaining(self) -> Optional[float]:
+        return self._remaining
+
+    @contextmanager
+    def _bucket(self) -> Iterator[None]:
+        """Hold the bucket for a read-modify-write: the process lock, plus the shared row's lock when `shared` is set."""
+        with self._lock:
+            if self.shared is None:
+                yield
+                return
+            with self.shared.rate_budget() as state:
+                for name, value in state.items():
+                    setattr(self, name, value)
+                yield
+                state.update({name: getattr(self, name) for name in self._STATE})
+
+    def update(self, headers: Mapping[str, str], status: Optional[int] = None) -> None:
+        """Re-size the budget from a response's headers; a 429 also blocks all requests until `Retry-After`."""
+        with self._bucket():
+            now: float = self._clock()
+            self._refill(now)
+            remaining, reset = headers.get("x-ratelimit-remaining"), headers.get("x-ratelimit-reset")
+            if remaining is not None and reset is not None:
+                self._remaining = float(remaining)
+                self._reset_at = now + float(reset)
+                self._rate = self._remaining / max(float(reset), 1.0)
+                RATELIMIT_REMAINING.set(self._remaining)
+                RATELIMIT_RESET.set(float(reset))
+            if status == 429:
+                self.stats["throttled"] += 1
+                self._blocked_until = now + (retry_after_seconds(headers) or max(self._reset_at - now, 1.0))
+                self._tokens = 0.0
+
+    async def aupdate(self, headers: Mapping[str, str], status: Optional[int] = None) -> None:
+        """Async `update`. With `shared`, the SQLite write transaction (which may wait on other workers) runs on a thread."""
+        if self.shared is None:
+            self.update(headers, status)
+        else:
+            await asyncio.to_thread(self.update, headers, status)
+
+    def acquire(self, level: Optional[int] = None) -> float:
+        """Block until a request may be sent. Returns the seconds spent waiting."""
+        level = request_priority.get() if level is None else level
+        waited: float = 0.0
+        self._enter(level)
+        try:
+            while (wait := self._try_take(level)) > 0:
+                time.sleep(wait)
+                waited += wait
+        finally:
+            self._exit(level, waited)
+        return waited
+
+    async def aacquire(self, level: Optional[int] = None) -> float:
+        """Async `acquire`; waits on the event loop instead of blocking it. With `shared`, each attempt's SQLite transaction runs on a thread."""
+        level = request_priority.get() if level is None else level
+        waited: float = 0.0
+        self._enter(level)
+        try:
+            while (wait := (self._try_take(level) if self.shared is None else await asyncio.to_thread(self._try_take, level))) > 0:
+                await asyncio.sleep(wait)
+                waited += wait
+        finally:
+            self._exit(level, waited)
+        return waited
+
+    def _enter(self, level: int) -> None:
+        if level == INTERACTIVE:
+            with self._counters_lock:
+                self._interactive_waiting += 1
+
+    def _exit(self, level: int, waited: float) -> None:
+        with self._counters_lock:
+            if level == INTERACTIVE:
+                self._interactive_waiting -= 1
+            self.stats["acquired"] += 1
+            self.stats["waited_seconds"] += waited
+
+    def _try_take(self, level: int) -> float:
+        """Take a token if one is available to `level` and return 0; otherwise return how long to wait before trying again."""
+        with self._bucket():
+            now: float = self._clock()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._remaining is not None and self._remaining < 1 and now < self._reset_at:
+                return self._reset_at - now
+            self._refill(now)
+
+            floor: float = 1.0
+            if level != INTERACTIVE:
+                floor += min(self.burst * BACKGROUND_RESERVE, self.burst - 1)
+                if self._interactive_waiting:
+                    return max(1 / self._rate, 0.05) if self._rate else 1.0
+
+            if self._tokens >= floor:
+                self._tokens -= 1
+                if self._remaining is not None:
+                    self._remaining -= 1
+                return 0.0
+            return (floor - self._tokens) / self._rate if self._rate > 0 else 1.0
+
+    def _refill(self, now: float) -> None:
+        """Top up tokens for the time since the last refill. Caller holds the lock."""
+        if self._remaining is not None and now >= self._reset_at:
+            self._remaining = None # Window rolled over; pace at the last known rate until headers say otherwise
+            self._rate = self._rate or self._base_rate # ...unless the old window ended exhausted, which left no rate at all
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+
+scheduler = RateLimitScheduler(shared=get_shared_state())
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+def retry_after_seconds(source: Any) -> Optional[float]:
+    """`Retry-After` in seconds, from a headers mapping or a prawcore exception carrying a response; `None` if absent."""
+    headers: Any = source if isinstance(source, Mapping) else getattr(getattr(source, "response", None), "headers", None)
+    value: Optional[str] = headers.get("retry-after") if headers else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None # HTTP-date form; Reddit sends seconds
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None, base: float = 2.0, cap: float = 60.0) -> float:
+    """Seconds to wait before retry number `attempt + 1`: the server's `Retry-After` if given, otherwise full-jitter exponential backoff."""
+    if retry_after is not None:
+        return retry_after + random.uniform(0, base / 2)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+# --------------------------------------------------------------------------------------------------------------------------
+
+class RateLimitedRequestor(prawcore.Requestor):
+    """`prawcore.Requestor` that waits on the shared scheduler before each request and feeds it each response's headers.
+    Pass as `praw.Reddit(requestor_class=RateLimitedRequestor)`."""
+
+    def request(self, *args: Any, timeout: Optional[float] = None, **kwargs: Any):
+        scheduler.acquire()
+        response = super().request(*args, timeout=timeout, **kwargs)
+        scheduler.update(response.headers, response.status_code)
+        return response
+
+
+# asyncprawcore 2.x (pinned in requirements.txt) returns the response from a coroutine; 3.x and later yield it from an
+# async context manager that releases it on exit. The session calls whichever shape the installed version has.
+ASYNC_REQUEST_IS_CONTEXT_MANAGER: bool = not inspect.iscoroutinefunction(asyncprawcore.Requestor.request)
+
+class AsyncRateLimitedRequestor(asyncprawcore.Requestor):
+    """`asyncprawcore.Requestor` counterpart of `RateLimitedRequestor`, for `asyncpraw.Reddit(requestor_class=...)`.
+    `request` keeps the shape of the installed asyncprawcore's (see `ASYNC_REQUEST_IS_CONTEXT_MANAGER`)."""
+
+    if ASYNC_REQUEST_IS_CONTEXT_MANAGER:
+        @asynccontextmanager
+        async def request(self, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> AsyncIterator[Any]:
+            await scheduler.aacquire()
+            async with super().request(*args, timeout=timeout, **kwargs) as response:
+                await scheduler.aupdate(response.headers, response.status)
+                yield response
+    else:
+        async def request(self, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any: # type: ignore[override]
+            await scheduler.aacquire()
+            response = await super().request(*args, timeout=timeout, **kwargs)
+            await scheduler.aupdate(response.headers, response.status)
+            return response
@@ -0,0 +1,163 @@
+"""Response cache for the FastAPI server: short TTL, in-flight request coalescing and stale-while-revalidate"""
+
+# With several uvicorn workers, each process has its own `ResponseCache`; given a `SharedState` they also share results
+# through it, and a per-key lease means one worker fetches while the others wait for its result.
+
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from redditor.shared import SHARED_LEASE_SECONDS, SharedState
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "30")) # seconds a result is served as fresh
+RESPONSE_CACHE_STALE_TTL: float = float(os.getenv("RESPONSE_CACHE_STALE_TTL", "300")) # further seconds it may be served stale while refreshing
+RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512"))
+SHARED_POLL_SECONDS: float = 0.02 # How often a worker waiting on another's fetch checks for the result
+
+
+class ResponseCache:
+    """Keyed cache of upstream results for one event loop.
+    - Fresh entries (younger than `ttl`) are served directly.
+    - Stale entries (younger than `ttl + stale_ttl`) are served immediately while one background task refreshes them.
+    - Concurrent misses for the same key wait on a single upstream call instead of each making their own.
+    - With `shared`, local misses are looked up in the cross-process store, and coalescing extends across processes.
+    Falsy results (the fetchers return `[]` on failure) are handed back but not cached."""
+
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, stale_ttl: float = RESPONSE_CACHE_STALE_TTL, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES,
+                 shared: Optional[SharedState] = None) -> None:
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.shared = shared
+        self.stats: dict[str, int] = {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "revalidations": 0, "shared_hits": 0, "shared_waits": 0}
+
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict() # key -> (value, stored_at)
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def hit_ratio(self) -> float:
+        served: int = self.stats["hits"] + self.stats["stale_hits"] + self.stats["coalesced"] + self.stats["shared_hits"]
+        total: int = served + self.stats["misses"]
+        return served / total if total else 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        return {**self.stats, "hit_ratio": round(self.hit_ratio, 4), "entries": len(self._entries), "inflight": len(self._inflight)}
+
+    def peek(self, key: Hashable, fetch: Optional[Callable[[], Awaitable[Any]]] = None) -> Optional[Any]:
+        """The cached value for `key` if it is still servable (fresh or stale), counted as a hit, without waiting on a fetch.
+        A stale hit starts the same background refresh `get_or_fetch` would, given `fetch`. A miss isn't counted; the caller
+        falls back to some other key."""
+        entry: Optional[tuple[Any, float]] = self._entries.get(key)
+        if entry is not None and (age := time.monotonic() - entry[1]) < self.ttl + self.stale_ttl:
+            self._entries.move_to_end(key)
+            self.stats["hits" if age < self.ttl else "stale_hits"] += 1
+            if age >= self.ttl and fetch is not None and key not in self._inflight:
+                self.stats["revalidations"] += 1
+                self._start(key, fetch)
+            return entry[0]
+        return None
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value for `key`, calling `fetch()` (at most once at a time per key) when it is missing or expired."""
+        entry: Optional[tuple[Any, float]] = self._entries.get(key)
+        from_shared: bool = False
+        if entry is None and self.shared is not None and key not in self._inflight:
+            entry = await self._load_shared(key)
+            from_shared = entry is not None
+        if entry is not None:
+            age: float = time.monotonic() - entry[1]
+            if age < self.ttl:
+                self._entries.move_to_end(key)
+                self.stats["shared_hits" if from_shared else "hits"] += 1
+                return entry[0]
+            if age < self.ttl + self.stale_ttl:
+                self._entries.move_to_end(key)
+                self.stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    self.stats["revalidations"] += 1
+                    self._start(key, fetch)
+                return entry[0]
+
+        inflight: Optional[asyncio.Future] = self._inflight.get(key)
+        if inflight is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._start(key, fetch))
+
+    async def put(self, key: Hashable, value: Any) -> None:
+        """Store `value` as a fresh entry for `key` (and in the shared store), for results built outside `get_or_fetch`."""
+        self._store(key, value)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set_response, repr(key), value, self.ttl + self.stale_ttl)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _start(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Future:
+        """Run `fetch()` as a task registered under `key`, so later callers can join it. Shielded, so one caller disconnecting doesn't cancel it for the rest."""
+        task: asyncio.Task = asyncio.ensure_future(fetch() if self.shared is None else self._fetch_shared(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda done: self._finish(key, done))
+        return task
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.warning(f"🟡 Upstream fetch for {key} failed: {task.exception()}")
+            return
+        if task.result():
+            self._store(key, task.result())
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    # -- Cross-process
+    async def _load_shared(self, key: Hashable) -> Optional[tuple[Any, float]]:
+        """Copy a servable entry for `key` from the shared store into this process, with its age carried over."""
+        found: Optional[tuple[Any, float]] = await asyncio.to_thread(self.shared.get_response, repr(key)) # type: ignore[union-attr]
+        if found is None:
+            return None
+        age: float = time.time() - found[1]
+        if age >= self.ttl + self.stale_ttl:
+            return None
+        entry: tuple[Any, float] = (found[0], time.monotonic() - age)
+        self._entries[key] = entry
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    async def _fetch_shared(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """`fetch()` under the key's cross-process lease, publishing the result. If another worker holds the lease, wait for
+        what it publishes instead; fetch anyway if it gives up (lease released or expired without a new entry)."""
+        name: str = repr(key)
+        started: float = time.time()
+        if await asyncio.to_thread(self.shared.claim, name): # type: ignore[union-attr]
+            try:
+                value: Any = await fetch()
+                if value:
+                    await asyncio.to_thread(self.shared.set_response, name, value, self.ttl + self.stale_ttl) # type: ignore[union-attr]
+                return value
+            finally:
+                await asyncio.to_thread(self.shared.release, name) # type: ignore[union-attr]
+
+        while time.time() - started < SHARED_LEASE_SECONDS:
+            await asyncio.sleep(SHARED_POLL_SECONDS)
+            found: Optional[tuple[Any, float]] = await asyncio.to_thread(self.shared.get_response, name) # type: ignore[union-attr]
+            if found is not None and found[1] >= started:
+                self.stats["shared_waits"] += 1
+                return found[0]
+            if not await asyncio.to_thread(self.shared.claimed, name): # type: ignore[union-attr]
+                break
+        return await fetch()
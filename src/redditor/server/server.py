@@ -1,17 +1,21 @@
 """FastAPI server"""
-# ⚠️ Recommended: Use Async PRAW for asynchronous implementation: https://asyncpraw.readthedocs.io/en/stable/
+# Uses Async PRAW so Reddit/Cohere I/O never blocks the event loop: https://asyncpraw.readthedocs.io/en/stable/
 import io
+import json
+import time
+import asyncio
+import sqlite3
 from contextlib import asynccontextmanager
 import logging
-from pathlib import Path
-from datetime import datetime
 from fastapi import FastAPI, Form, HTTPException, Request
 from fastapi.datastructures import FormData
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from asyncprawcore.exceptions import Forbidden, NotFound, Redirect
 from starlette.templating import _TemplateResponse as TemplateResponse
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 
 import os
 import sys
@@ -19,14 +23,21 @@ import sys
 sys.path.append("/app/src")  # If /app/src is your mounted path in Docker
 
 
-# from ..main import create_client, fetch_latest_posts  # uncomment to use in Docker
-from redditor.main import create_client, fetch_latest_posts  # uncomment to use in standalone mode
+# from ..aio import afetch_posts, afetch_latest_posts, afetch_many_posts, close_async_client  # uncomment to use in Docker
+from redditor.aio import afetch_posts, afetch_latest_posts, afetch_many_posts, close_async_client  # uncomment to use in standalone mode
+from redditor import ai
+from redditor.ai import EXPOUND_MAX_WORKERS, aexpound_title
+from redditor.archive import archive_posts, get_archive
+from redditor.backfill import aiter_posts
+from redditor.listing import SubredditNotFound
+from redditor.logs import setup_logging
+from redditor.metrics import CACHE_EVENTS, HTTP_SECONDS, render, request_timings, server_timing, span
+from redditor.models import Post, encode_posts, parse_fields
+from redditor.server.cache import ResponseCache
+from redditor.shared import get_shared_state
 
 # -- Logging
-logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
-LOG_FILE: Path = Path(__file__).parent.parent.parent / "logs" / f"{datetime.now().strftime('%Y-%m-%d')}.log"
-LOG_FILE.parent.mkdir(parents=True, exist_ok=True)  # Ensure the logs directory exists
-logging.basicConfig(filename=LOG_FILE, level=logging.INFO, encoding='utf-8', format="%(asctime)s - %(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
+setup_logging()  # Log calls on the event loop only enqueue; a background thread does the disk writes
 logger: logging.Logger = logging.getLogger(__name__)
 
 
@@ -35,7 +46,8 @@ logger: logging.Logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Lifespan event handler for the FastAPI app."""
     logger.info("🛫 Starting up...")
-    yield
+    yield  # The shared async Reddit client is created on the first request, so startup does no network I/O
+    await close_async_client()
     logger.info("🛬 Shutting down...")
 
 app = FastAPI(title="Redditor Demo", lifespan=lifespan)
@@ -48,6 +60,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# -- Request metrics; `Server-Timing` breaks each response down by span (Reddit, Cohere, render) in browser dev tools
+METRICS_TIMING_HEADER: bool = os.getenv("METRICS_TIMING_HEADER", "true").lower() not in ("0", "false", "no")
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next: Callable[[Request], Awaitable[Response]]) -> Response:
+    timings: dict[str, float] = {}
+    token = request_timings.set(timings)
+    start: float = time.perf_counter()
+    try:
+        response: Response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    elapsed: float = time.perf_counter() - start
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(elapsed, method=request.method, route=getattr(route, "path", "unmatched"), status=response.status_code)
+    if METRICS_TIMING_HEADER:
+        response.headers["Server-Timing"] = server_timing({**timings, "total": elapsed})
+    return response
+
+# -- Response cache, keyed by (subreddit, n); shared between workers when SHARED_STATE_FILE is set
+response_cache = ResponseCache(shared=get_shared_state())
+
 # -- Static files and templates
 app.mount("/static", StaticFiles(directory="src/redditor/server/static"), name="static")
 templates = Jinja2Templates(directory="src/redditor/server/templates")
@@ -65,17 +99,178 @@ async def fetch_posts(request: Request, subreddit: str = Form(...), n: int = For
     # logger.addHandler(stream_handler)
 
     # Fetch posts
-    posts: list[dict[str, str]] = fetch_latest_posts(subreddit_name=subreddit, limit=n)
+    posts: list[dict[str, Any]] = await response_cache.get_or_fetch(
+        (subreddit.lower(), n), lambda: afetch_latest_posts(subreddit_name=subreddit, limit=n)
+    )
 
     # Detach handler and extract lines
     # logger.removeHandler(stream_handler)
     # logs: list[str] = log_stream.getvalue().strip().splitlines()
 
     # return templates.TemplateResponse("index.html", context={"request": request, "posts": posts, "logs": logs})
-    return templates.TemplateResponse("index.html", context={"request": request, "posts": posts})
+    with span("render"):
+        return templates.TemplateResponse("index.html", context={"request": request, "posts": posts})
+
+@app.post("/fetch_posts/stream/", response_class=StreamingResponse)
+async def fetch_posts_stream(subreddit: str = Form(...), n: int = Form(5)) -> StreamingResponse:
+    """Same page as `/fetch_posts/`, streamed: the shell goes out at once, each post as soon as the listing arrives, and each expansion as it completes."""
+    return StreamingResponse(stream_posts(subreddit, n), media_type="text/html", headers={"X-Accel-Buffering": "no"})
+
+# Expansions in flight for the streamed page, by title: concurrent streams of the same posts share one Cohere call per title
+_expound_slots = asyncio.Semaphore(EXPOUND_MAX_WORKERS)
+_expansions: dict[str, tuple[asyncio.Task, list[int]]] = {} # title -> (call, [streams waiting on it])
+
+async def _expound_shared(title: str) -> Optional[str]:
+    """`aexpound_title(title)`, joining the call another stream already has in flight for it. The call is cancelled only
+    once every stream waiting on it has gone."""
+    if title not in _expansions:
+        async def expound() -> Optional[str]:
+            async with _expound_slots:
+                return await aexpound_title(title)
+        task: asyncio.Task = asyncio.create_task(expound())
+        _expansions[title] = (task, [0])
+        task.add_done_callback(lambda done: _expansions.pop(title) if _expansions.get(title, (None,))[0] is done else None)
+    task, waiting = _expansions[title]
+    waiting[0] += 1
+    try:
+        return await asyncio.shield(task)
+    finally:
+        waiting[0] -= 1
+        if not waiting[0] and not task.done(): # Every client went away mid-stream; don't keep calling Cohere for them
+            _expansions.pop(title, None)
+            task.cancel()
+
+async def stream_posts(subreddit: str, n: int) -> AsyncIterator[str]:
+    page = templates.get_template("stream.html").module
+    yield page.page_start(subreddit, n)
+
+    key: tuple[str, int] = (subreddit.lower(), n) # The finished page, as `/fetch_posts/` caches it
+    cached: Optional[list[dict[str, Any]]] = response_cache.peek(key, lambda: afetch_latest_posts(subreddit_name=subreddit, limit=n))
+    posts: Optional[list[Post]] = None
+    if cached:
+        items: list[dict[str, Any]] = [dict(item) for item in cached] # Copies; expansions missing from the cached page are filled in below
+    else:
+        # The listing alone goes through the cache (coalesced with concurrent streams of the same page), so expansions can stream
+        posts = await response_cache.get_or_fetch(
+            ("listing", subreddit.lower(), n), lambda: afetch_posts(subreddit_name=subreddit, limit=n, expound=False)
+        )
+        items = [post.as_dict() for post in posts]
+    if not items:
+        yield page.no_posts(subreddit)
+        yield page.page_end()
+        return
+
+    yield "".join([page.posts_start(), *(page.post_item(i, item) for i, item in enumerate(items)), page.posts_end()])
+
+    async def expand(i: int, title: str) -> tuple[int, Optional[str]]:
+        return i, await _expound_shared(title)
+
+    tasks: list[asyncio.Task] = [asyncio.create_task(expand(i, item["title"])) for i, item in enumerate(items) if item["expounded"] is None]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            i, expounded = await next_done
+            items[i]["expounded"] = expounded
+            if posts is not None:
+                posts[i].expounded = expounded
+            yield page.expounded(i, expounded or "No expansion available.")
+    finally:
+        for task in tasks: # Client went away mid-stream; stop waiting (the shared call stops once no stream waits on it)
+            task.cancel()
+
+    # Only reached once every expansion is in: cache the finished page and archive the expansions
+    if posts is not None:
+        if all(post.expounded is not None for post in posts):
+            await response_cache.put(key, items)
+        await asyncio.to_thread(archive_posts, posts)
+    yield page.page_end()
+
+@app.get("/api/posts")
+async def api_posts(subreddit: str, n: int = 5, fields: Optional[str] = None) -> Response:
+    """Latest `n` posts from `subreddit` as JSON records. `fields=id,title,...` keeps only those fields; titles are only sent to Cohere when `expounded` is requested."""
+    names: tuple[str, ...] = _fields_or_400(fields)
+    posts = await response_cache.get_or_fetch(
+        ("api", subreddit.lower(), n, "expounded" in names), lambda: afetch_posts(subreddit_name=subreddit, limit=n, expound="expounded" in names)
+    )
+    return Response(content=encode_posts(posts, names), media_type="application/json")
+
+@app.get("/api/posts/backfill")
+async def api_posts_backfill(subreddit: str, n: Optional[int] = None, after: Optional[str] = None, fields: Optional[str] = None) -> StreamingResponse:
+    """Up to `n` (default: as many as Reddit lists) posts from `subreddit`, newest first, as newline-delimited JSON, streamed page by page.
+    Resume an interrupted backfill with `after=t3_<id of the last post received>`. Titles are not expanded."""
+    names: tuple[str, ...] = _fields_or_400(fields)
+    posts: AsyncIterator[Post] = aiter_posts(subreddit, limit=n, after=after)
+    try: # Pull the first page before committing to a 200, so a bad subreddit is still a 404
+        first: Optional[Post] = await anext(posts)
+    except StopAsyncIteration:
+        first = None
+    except (Redirect, NotFound, Forbidden, SubredditNotFound):
+        raise HTTPException(status_code=404, detail=f"r/{subreddit} does not exist or is private.")
+
+    def line(post: Post) -> bytes:
+        return json.dumps(post.project(names), ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+
+    async def lines() -> AsyncIterator[bytes]:
+        if first is not None:
+            yield line(first)
+            async for post in posts:
+                yield line(post)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/api/archive/top")
+async def archive_top(subreddit: str, n: int = 10, hours: float = 24, fields: Optional[str] = None) -> Response:
+    """Top `n` archived posts by score in `subreddit` over the last `hours`, answered locally."""
+    archive, names = _archive_or_404(), _fields_or_400(fields)
+    posts = await asyncio.to_thread(archive.top, subreddit, n, time.time() - hours * 60 * 60)
+    return Response(content=encode_posts(posts, names), media_type="application/json")
+
+@app.get("/api/archive/search")
+async def archive_search(q: str, subreddit: Optional[str] = None, n: int = 20, fields: Optional[str] = None) -> Response:
+    """Full-text search over archived titles (FTS5 query syntax), best matches first."""
+    archive, names = _archive_or_404(), _fields_or_400(fields)
+    try:
+        posts = await asyncio.to_thread(archive.search, q, subreddit, n)
+    except sqlite3.OperationalError as e: # Malformed FTS5 query
+        raise HTTPException(status_code=400, detail=f"Invalid search query: {e}")
+    return Response(content=encode_posts(posts, names), media_type="application/json")
+
+def _archive_or_404():
+    archive = get_archive()
+    if archive is None:
+        raise HTTPException(status_code=404, detail="The archive is disabled (ARCHIVE_ENABLED=false).")
+    return archive
+
+def _fields_or_400(fields: Optional[str]) -> tuple[str, ...]:
+    try:
+        return parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/batch_posts")
+async def batch_posts(subreddits: str, n: int = 5) -> dict:
+    """Latest `n` posts from each of a comma-separated list of subreddits, fetched concurrently. Per-subreddit `posts` and `error`."""
+    names: list[str] = subreddits.split(",")
+    if not any(name.strip() for name in names):
+        raise HTTPException(status_code=400, detail="No subreddits given.")
+    return await afetch_many_posts(names, limit=n)
+
+@app.get("/cache/stats")
+async def cache_stats() -> dict:
+    """Response cache counters: hits, stale hits, misses, coalesced waiters and hit ratio."""
+    return response_cache.snapshot()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint: span latencies, HTTP latencies, retries, errors, Reddit rate-limit headroom and cache counters."""
+    for event, value in response_cache.stats.items():
+        CACHE_EVENTS.set(value, cache="response", event=event)
+    for event, value in ai.cache.stats.items():
+        CACHE_EVENTS.set(value, cache="expansion", event=event)
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app=app, host="localhost", port=8045, log_level="info")
+    workers: int = int(os.getenv("WEB_CONCURRENCY", "1")) # More than one needs SHARED_STATE_FILE to share the cache and rate budget
+    uvicorn.run("redditor.server.server:app", host="localhost", port=8045, log_level="info", workers=workers)
 
     print("\n🐬")
\ No newline at end of file
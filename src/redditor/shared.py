@@ -0,0 +1,131 @@
+"""State shared by every worker process on a host: the server's response cache, fetch leases and the Reddit rate budget"""
+
+# SQLite WAL: https://www.sqlite.org/wal.html
+# One SQLite file, opened by each process. Readers never block; writers take the database lock for a few microseconds
+# (`BEGIN IMMEDIATE`), which serialises the rate-budget read-modify-write across processes. Disabled unless
+# `SHARED_STATE_FILE` is set; single-process runs keep everything in memory.
+
+import os
+import json
+import time
+import pickle
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+SHARED_STATE_FILE: Optional[Path] = Path(os.environ["SHARED_STATE_FILE"]) if os.getenv("SHARED_STATE_FILE") else None
+SHARED_LEASE_SECONDS: float = float(os.getenv("SHARED_LEASE_SECONDS", "30")) # Longest one worker may hold a key before others give up waiting
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value BLOB NOT NULL, stored_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS responses_stored_at ON responses (stored_at);
+CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner INTEGER NOT NULL, expires_at REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS rate_budget (id INTEGER PRIMARY KEY CHECK (id = 0), state TEXT NOT NULL);
+"""
+
+
+class SharedState:
+    """Cross-process store for cached responses, per-key fetch leases and the rate-limit bucket.
+    Responses are pickled; the file is local to the host and written only by this app. Times are wall-clock (`time.time()`)."""
+
+    _PRUNE_EVERY: int = 64 # Expired responses are deleted once per this many writes
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._pid: int = 0
+        self._writes = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """This process's connection; reopened after a fork, since SQLite connections must not cross processes."""
+        if self._db is None or self._pid != os.getpid():
+            self._db = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.executescript(SCHEMA)
+            self._pid = os.getpid()
+        return self._db
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            db: sqlite3.Connection = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                yield db
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            db.execute("COMMIT")
+
+    # -- Responses
+    def get_response(self, key: str) -> Optional[tuple[Any, float]]:
+        """`(value, stored_at)` for `key`, or `None`."""
+        with self._lock:
+            row = self.db.execute("SELECT value, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        return (pickle.loads(row[0]), row[1]) if row is not None else None
+
+    def set_response(self, key: str, value: Any, max_age: float) -> None:
+        """Store `value` under `key`; entries older than `max_age` seconds are pruned now and then."""
+        now: float = time.time()
+        blob: bytes = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._transaction() as db:
+            db.execute("INSERT OR REPLACE INTO responses (key, value, stored_at) VALUES (?, ?, ?)", (key, blob, now))
+            self._writes += 1
+            if self._writes % self._PRUNE_EVERY == 0:
+                db.execute("DELETE FROM responses WHERE stored_at < ?", (now - max_age,))
+
+    # -- Leases: at most one process fetches a given key at a time
+    def claim(self, key: str, lease: float = SHARED_LEASE_SECONDS) -> bool:
+        """Take the fetch lease for `key` unless another live holder has it. Expired leases (a crashed worker) are taken over."""
+        now: float = time.time()
+        with self._transaction() as db:
+            db.execute("DELETE FROM leases WHERE key = ? AND expires_at < ?", (key, now))
+            return db.execute("INSERT OR IGNORE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)", (key, os.getpid(), now + lease)).rowcount == 1
+
+    def claimed(self, key: str) -> bool:
+        with self._lock:
+            return self.db.execute("SELECT 1 FROM leases WHERE key = ? AND expires_at >= ?", (key, time.time())).fetchone() is not None
+
+    def release(self, key: str) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, os.getpid()))
+
+    # -- Rate budget
+    @contextmanager
+    def rate_budget(self) -> Iterator[dict[str, float]]:
+        """Read-modify-write the shared bucket under the database lock. Yields `{}` the first time; whatever the caller leaves in it is saved."""
+        with self._transaction() as db:
+            row = db.execute("SELECT state FROM rate_budget WHERE id = 0").fetchone()
+            state: dict[str, float] = json.loads(row[0]) if row is not None else {}
+            yield state
+            db.execute("INSERT OR REPLACE INTO rate_budget (id, state) VALUES (0, ?)", (json.dumps(state),))
+
+    def clear(self) -> None:
+        with self._transaction() as db:
+            db.execute("DELETE FROM responses")
+            db.execute("DELETE FROM leases")
+            db.execute("DELETE FROM rate_budget")
+
+
+_shared: Optional[SharedState] = None
+_shared_lock = threading.Lock()
+
+def get_shared_state() -> Optional[SharedState]:
+    """Process-wide handle on `SHARED_STATE_FILE`; `None` when it isn't set (single-process mode)."""
+    global _shared
+    if SHARED_STATE_FILE is None:
+        return None
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = SharedState(SHARED_STATE_FILE)
+    return _shared
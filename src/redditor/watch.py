@@ -0,0 +1,158 @@
+"""Incremental watcher: poll subreddits for new submissions only"""
+
+# Reddit listings: https://www.reddit.com/dev/api/#listings
+# Each poll asks for items `before` the newest fullname seen so far, so steady state costs one small request per
+# subreddit and only genuinely new titles are expanded. Cursors and a bounded seen-set persist across restarts.
+
+import os
+import json
+import time
+import logging
+import argparse
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from praw import Reddit
+
+from redditor.ai import expound_titles
+from redditor.archive import archive_posts
+from redditor.listing import LISTING_PAGE_SIZE, fetch_listing
+from redditor.main import get_client
+from redditor.models import Post, apply_expansions, titles
+from redditor.ratelimit import BACKGROUND, priority
+
+logger: logging.Logger = logging.getLogger(__name__)
+
+WATCH_STATE_FILE: Path = Path(os.getenv("WATCH_STATE_FILE") or Path(__file__).parent.parent.parent / ".cache" / "watch_state.json")
+WATCH_INTERVAL: float = float(os.getenv("WATCH_INTERVAL", "60")) # seconds between polls of each subreddit
+WATCH_SEEN_SIZE: int = int(os.getenv("WATCH_SEEN_SIZE", "1000")) # ids remembered per subreddit
+FULL_SWEEP_EVERY: int = 10 # Empty polls before re-reading the front page without a cursor (the cursor post may have been deleted)
+
+
+class SeenSet:
+    """Insertion-ordered set capped at `size`; the oldest ids fall out first."""
+    def __init__(self, size: int = WATCH_SEEN_SIZE, ids: Optional[list[str]] = None) -> None:
+        self.size = size
+        self._ids: OrderedDict[str, None] = OrderedDict.fromkeys(ids or [])
+
+    def __contains__(self, post_id: str) -> bool:
+        return post_id in self._ids
+
+    def add(self, post_id: str) -> None:
+        self._ids[post_id] = None
+        self._ids.move_to_end(post_id)
+        while len(self._ids) > self.size:
+            self._ids.popitem(last=False)
+
+    def to_list(self) -> list[str]:
+        return list(self._ids)
+
+
+class SubredditWatcher:
+    """Polls subreddits and yields only posts not seen before, oldest first. State is saved to `state_file` after every poll that finds something."""
+
+    def __init__(self, subreddit_names: list[str], reddit: Optional[Reddit] = None, state_file: Optional[Path] = WATCH_STATE_FILE, seen_size: int = WATCH_SEEN_SIZE, expound: bool = True) -> None:
+        self.subreddit_names = subreddit_names
+        self.reddit = reddit
+        self.state_file = state_file
+        self.seen_size = seen_size
+        self.expound = expound
+        self.stats: dict[str, int] = {"polls": 0, "new_posts": 0, "duplicates": 0, "full_sweeps": 0}
+
+        self._cursors: dict[str, Optional[str]] = {} # subreddit -> newest fullname
+        self._seen: dict[str, SeenSet] = {}
+        self._empty_polls: dict[str, int] = {}
+        self._load()
+
+    def poll(self, subreddit_name: str) -> list[dict[str, Any]]:
+        """One request for `subreddit_name`'s submissions newer than its cursor. Returns the new posts, oldest first."""
+        reddit: Reddit = self.reddit or get_client()
+        key: str = subreddit_name.lower()
+        seen: SeenSet = self._seen.setdefault(key, SeenSet(self.seen_size))
+        cursor: Optional[str] = self._cursors.get(key)
+
+        before: Optional[str] = None
+        if cursor and self._empty_polls.get(key, 0) < FULL_SWEEP_EVERY:
+            before = cursor
+        elif cursor:
+            self.stats["full_sweeps"] += 1
+
+        with priority(BACKGROUND):
+            listed: list[Post] = fetch_listing(reddit, subreddit_name, LISTING_PAGE_SIZE, before=before)[0]
+        self.stats["polls"] += 1
+
+        posts: list[Post] = []
+        for post in reversed(listed): # Listings are newest first
+            if post.id in seen:
+                self.stats["duplicates"] += 1
+                continue
+            seen.add(post.id)
+            posts.append(post)
+
+        if listed:
+            self._cursors[key] = f"t3_{listed[0].id}"
+        self._empty_polls[key] = 0 if posts or before is None else self._empty_polls.get(key, 0) + 1
+
+        apply_expansions(posts, expound_titles(titles(posts)) if posts and self.expound else None)
+
+        if posts:
+            self.stats["new_posts"] += len(posts)
+            archive_posts(posts)
+            self._save()
+            logger.info(f"🟢 {len(posts)} new posts in r/{subreddit_name}")
+        return [{"id": post.id, "subreddit": post.subreddit, "created_utc": post.created_utc, **post.as_dict()} for post in posts]
+
+    def watch(self, interval: float = WATCH_INTERVAL, max_polls: Optional[int] = None) -> Iterator[dict[str, Any]]:
+        """Poll every subreddit once per `interval` seconds, forever (or for `max_polls` rounds), yielding each new post as it's found.
+        On first run (no saved cursor) the current front page counts as new."""
+        rounds = 0
+        while max_polls is None or rounds < max_polls:
+            started: float = time.monotonic()
+            for subreddit_name in self.subreddit_names:
+                try:
+                    yield from self.poll(subreddit_name)
+                except Exception as e:
+                    logger.warning(f"🟡 Poll of r/{subreddit_name} failed; retrying next round: {e}")
+            rounds += 1
+            if max_polls is None or rounds < max_polls:
+                time.sleep(max(interval - (time.monotonic() - started), 0))
+
+    def _load(self) -> None:
+        if self.state_file is None or not self.state_file.is_file():
+            return
+        try:
+            state: dict[str, Any] = json.loads(self.state_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"🟡 Ignoring unreadable watcher state {self.state_file}: {e}")
+            return
+        for key, entry in state.items():
+            self._cursors[key] = entry.get("newest")
+            self._seen[key] = SeenSet(self.seen_size, entry.get("seen", []))
+
+    def _save(self) -> None:
+        """Write all cursors and seen-sets atomically (temp file + rename), so a crash can't leave a half-written state file."""
+        if self.state_file is None:
+            return
+        state: dict[str, Any] = {key: {"newest": self._cursors.get(key), "seen": seen.to_list()} for key, seen in self._seen.items()}
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp: Path = self.state_file.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        tmp.replace(self.state_file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print new posts from subreddits as they appear.")
+    parser.add_argument("subreddits", nargs="+")
+    parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="Seconds between polls")
+    parser.add_argument("--no-expound", action="store_true", help="Skip Cohere title expansion")
+    args = parser.parse_args()
+
+    watcher = SubredditWatcher(args.subreddits, expound=not args.no_expound)
+    try:
+        for post in watcher.watch(interval=args.interval):
+            print(f"r/{post['subreddit']} | {post['title']} | by {post['author']} | {post['upvotes']} upvotes\n    {post['expounded']}")
+    except KeyboardInterrupt:
+        print(f"\nWatcher stats: {watcher.stats}")
+
+    print("\n🐬")